@@ -3,14 +3,12 @@ from fastapi.responses import FileResponse
 import pandas as pd
 import yaml
 import os
-from dq_engine import run_all_checks
+from dq_engine import run_all_checks, build_dtype_map
 
 app = FastAPI()
 
 @app.post("/run-checks/")
 async def run_checks(file: UploadFile = File(...), rules_file: UploadFile = File(None)):
-    df = pd.read_csv(file.file)
-
     # Load rules
     if rules_file:
         rules = yaml.safe_load(rules_file.file)
@@ -18,6 +16,16 @@ async def run_checks(file: UploadFile = File(...), rules_file: UploadFile = File
         with open("config/rules_config.yaml", "r") as f:
             rules = yaml.safe_load(f)
 
+    dtype_map = build_dtype_map(rules)
+
+    # Typed Arrow read; fall back to the default engine if pyarrow is missing or rejects the file
+    # (pyarrow.lib.ArrowInvalid is a ValueError subclass)
+    try:
+        df = pd.read_csv(file.file, engine="pyarrow", dtype_backend="pyarrow", dtype=dtype_map)
+    except (ImportError, ValueError):
+        file.file.seek(0)
+        df = pd.read_csv(file.file)
+
     results = run_all_checks(df, rules)
 
     output_file = "DQ_Report.xlsx"
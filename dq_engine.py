@@ -1,3 +1,5 @@
+import functools
+
 import pandas as pd
 import yaml
 
@@ -7,11 +9,32 @@ from dq_checks.range_checks import check_age_range
 from dq_checks.pattern_checks import check_pattern
 from dq_checks.value_domain_checks import check_allowed_values
 
-# Load rules once
-with open("config/rules_config.yaml", "r") as file:
-    rules = yaml.safe_load(file)
+@functools.lru_cache(maxsize=1)
+def _default_rules():
+    """Load config/rules_config.yaml lazily, only when no rules are passed in."""
+    with open("config/rules_config.yaml", "r") as file:
+        return yaml.safe_load(file)
+
+def build_dtype_map(rules):
+    """
+    Derive a read_csv dtype mapping from the rules so pandas can skip type inference.
+
+    The range-checked 'age' column becomes a nullable Arrow int; pattern and
+    allowed-value columns become Arrow strings. Other min/max columns are left to
+    inference, since run_all_checks does not range-check them and a float there
+    would make the typed read fail.
+    """
+    dtype_map = {}
+    for col, config in rules.get("columns", {}).items():
+        if col == "age" and ("min" in config or "max" in config):
+            dtype_map[col] = "int32[pyarrow]"
+        elif "pattern" in config or "allowed_values" in config:
+            dtype_map[col] = "string[pyarrow]"
+    return dtype_map
 
-def run_all_checks(df, rules):
+def run_all_checks(df, rules=None):
+    if rules is None:
+        rules = _default_rules()
     results = {}
 
     # Null check
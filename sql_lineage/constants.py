@@ -29,7 +29,8 @@ REMARKS = {
 
 # Ordered keys for each lineage output row (dict); used to normalize and serialize results.
 # Note: Uses camelCase format (databaseName, tableName, etc.)
-OUTPUT_KEYS = [
+# A tuple so the re-exported constant cannot be mutated by a caller.
+OUTPUT_KEYS = (
     "databaseName",
     "tableName",
     "tableAliasName",
@@ -39,4 +40,4 @@ OUTPUT_KEYS = [
     "metadatakey",
     "viewName",
     "remarks",
-]
\ No newline at end of file
+)
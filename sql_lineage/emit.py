@@ -7,81 +7,133 @@ from sqlglot import exp
 
 from constants import REMARKS
 from utils import ensure_list, safe_name
+from helpers import resolve_column
 from scope import (
-    _pick_base_table_from_subquery,
+    ScopeEntry,
+    _FROM_KEY,
+    _pick_base_table_from_query,
     _resolve_source,
     _attach_enclosing_alias_if_missing,
 )
 
+# resolve_column remarks meaning the qualifier matched a scope entry
+_RESOLVED_REMARKS = (REMARKS["COLUMN_SELECTED_WITH_DB"], REMARKS["DATABASE_NOT_SPECIFIED"])
 
-def emit_dataset_lineage(ast, regulation, metadatakey, view_name):
+# Remark labels used per emitted row, bound once at import
+_R_ALL_COLUMNS = REMARKS["ALL_COLUMNS"]
+_R_DERIVED_TABLE = REMARKS["DERIVED_TABLE"]
+_R_INVALID_ALIAS = REMARKS["INVALID_TABLE_ALIAS"]
+
+
+class LineageRow:
+    """
+    One intermediate lineage row. Slots keep the per-query result buffer small;
+    rows are turned into OUTPUT_KEYS dicts once, at the end of extraction.
+    """
+    __slots__ = (
+        "db",
+        "table",
+        "table_alias",
+        "column",
+        "alias",
+        "regulation",
+        "metadatakey",
+        "view_name",
+        "remarks",
+    )
+
+    def __init__(
+        self,
+        db: str,
+        table: str,
+        table_alias: str,
+        column: str,
+        alias: str,
+        regulation: str,
+        metadatakey: str,
+        view_name: str,
+        remarks: List[str],
+    ) -> None:
+        self.db = db
+        self.table = table
+        self.table_alias = table_alias
+        self.column = column
+        self.alias = alias
+        self.regulation = regulation
+        self.metadatakey = metadatakey
+        self.view_name = view_name
+        self.remarks = remarks
+
+
+def emit_dataset_lineage(
+    ast: exp.Expression,
+    regulation: str,
+    metadatakey: str,
+    view_name: str,
+) -> List[LineageRow]:
     """
     Handles:
       SELECT * FROM ( SELECT ... ) TSR_TS_DATA
 
     Uses SQLGlot AST correctly:
-      select.args['from']
+      select.args[_FROM_KEY]
     """
-    rows = []
-
-    for select in ast.find_all(exp.Select):
-        # check outermost SELECT (no parent Select above it)
-        parent = select.parent
-        while parent:
-            if isinstance(parent, exp.Select):
-                break
-            parent = parent.parent
-        else:
-            # outermost
-            from_node = select.args.get("from")
-            if not from_node:
-                continue
-
-            subq = from_node.this
-            if isinstance(subq, exp.Subquery) and subq.alias_or_name:
-                # ensure SELECT *
-                if any(isinstance(e, exp.Star) for e in select.expressions):
-                    db, base_table = _pick_base_table_from_subquery(subq)
-
-                    if not base_table:
-                        base_table = subq.alias_or_name
-                        table_alias = ""
-                    else:
-                        table_alias = subq.alias_or_name
-
-                    rows.append({
-                        "databaseName": db or "",
-                        "tableName": base_table or "",
-                        "tableAliasName": table_alias,
-                        "columnName": "*",
-                        "aliasName": "",
-                        "regulation": regulation,
-                        "metadatakey": metadatakey,
-                        "viewName": view_name,
-                        "remarks": [
-                            REMARKS["ALL_COLUMNS"],
-                            REMARKS["DERIVED_TABLE"],
-                        ],
-                    })
+    rows: List[LineageRow] = []
+
+    # Outermost SELECTs only: the walk does not descend below a Select (no parent walks)
+    for select in ast.bfs(prune=lambda node: isinstance(node, exp.Select)):
+        if not isinstance(select, exp.Select):
+            continue
+        from_node = select.args.get(_FROM_KEY)
+        if not from_node:
+            continue
+
+        subq = from_node.this
+        subq_name = subq.alias_or_name if isinstance(subq, exp.Subquery) else None
+        if subq_name:
+            # ensure SELECT *
+            if any(isinstance(e, exp.Star) for e in select.expressions):
+                db, base_table = _pick_base_table_from_query(subq)
+
+                if not base_table:
+                    base_table = subq_name
+                    table_alias = ""
+                else:
+                    table_alias = subq_name
+
+                rows.append(LineageRow(
+                    db or "",
+                    base_table or "",
+                    table_alias,
+                    "*",
+                    "",
+                    regulation,
+                    metadatakey,
+                    view_name,
+                    [
+                        _R_ALL_COLUMNS,
+                        _R_DERIVED_TABLE,
+                    ],
+                ))
     return rows
 
 
 def _emit_column_lineage(
-    results,
+    results: List[LineageRow],
     qualifier: Optional[str],
     column_name: str,
-    from_scope: dict,
+    from_scope: Dict[str, ScopeEntry],
     regulation: str,
     metadatakey: str,
     view_name: str,
-    remark_list,
+    remark_list: List[str],
     fallback_alias: Optional[str] = None,
     explicit_table_name: Optional[str] = None,
     explicit_table_alias: Optional[str] = None,
-    local_scope: Optional[dict] = None,
-):
+    local_scope: Optional[Dict[str, ScopeEntry]] = None,
+) -> None:
     """
-    Emits a normalized lineage row.
+    Appends a LineageRow to results.
 
     Resolution order:
       1) explicit_table_* overrides (if provided)
@@ -97,17 +149,12 @@ def _emit_column_lineage(
 
     # Resolve from scope if explicit not given
     if not table or not table_alias:
-        if effective_qualifier and effective_qualifier in from_scope:
-            _, db, table, table_alias = from_scope[effective_qualifier]
-        elif len(from_scope) == 1:
-            _, db, table, table_alias = next(iter(from_scope.values()))
-        # Single source in this SELECT (e.g. FROM cte or one table): resolve via that key
-        elif local_scope and len(local_scope) == 1:
-            key = next(iter(local_scope.keys()))
-            if key in from_scope:
-                _, db, table, table_alias = from_scope[key]
-    if not table and qualifier in from_scope:
-        _, db, table, table_alias = from_scope[qualifier]       
+        r_db, r_table, r_alias, remark = resolve_column(effective_qualifier, from_scope, local_scope)
+        if remark in _RESOLVED_REMARKS:
+            db, table, table_alias = r_db, r_table, r_alias
+    entry = from_scope.get(qualifier) if not table else None
+    if entry is not None:
+        db, table, table_alias = entry.db, entry.table, entry.alias
 
     # If still no table, handle invalid / derived
     if not table:
@@ -115,43 +162,43 @@ def _emit_column_lineage(
             # INVALID ALIAS -> do not invent table; capture alias
             table = ""
             table_alias = effective_qualifier
-            if REMARKS["INVALID_TABLE_ALIAS"] not in remark_list:
-                remark_list.append(REMARKS["INVALID_TABLE_ALIAS"])
+            if _R_INVALID_ALIAS not in remark_list:
+                remark_list.append(_R_INVALID_ALIAS)
         else:
             # TRUE DERIVED (subquery alias)
             table = effective_qualifier or ""
             table_alias = ""
-            if REMARKS["DERIVED_TABLE"] not in remark_list:
-                remark_list.append(REMARKS["DERIVED_TABLE"])
-
-    results.append({
-        "databaseName": str(db or "").lower(),
-        "tableName": str(table or "").lower(),
-        "tableAliasName": str(table_alias or (effective_qualifier or "")).lower(),
-        "columnName": str(column_name or "").lower(),
-        "aliasName": "",
-        "regulation": regulation,
-        "metadatakey": metadatakey,
-        "viewName": view_name,
-        "remarks": ensure_list(remark_list),
-    })
+            if _R_DERIVED_TABLE not in remark_list:
+                remark_list.append(_R_DERIVED_TABLE)
+
+    results.append(LineageRow(
+        str(db or "").lower(),
+        str(table or "").lower(),
+        str(table_alias or (effective_qualifier or "")).lower(),
+        str(column_name or "").lower(),
+        "",
+        regulation,
+        metadatakey,
+        view_name,
+        ensure_list(remark_list),
+    ))
 
 
 def resolve_star(
-    star_node,
-    local_scope,
-    global_scope,
-    enclosing_alias,
-    regulation,
-    metadatakey,
-    view_name,
-):
+    star_node: exp.Star,
+    local_scope: Dict[str, ScopeEntry],
+    global_scope: Dict[str, ScopeEntry],
+    enclosing_alias: Optional[str],
+    regulation: str,
+    metadatakey: str,
+    view_name: str,
+) -> List[LineageRow]:
     """Resolve SELECT * (or tbl.*) to one lineage row with Column Name '*'."""
     qualifier = ""
     if hasattr(star_node, "table") and star_node.table:
         qualifier = star_node.table
     else:
-        this_arg = getattr(star_node, "args", {}).get("this")
+        this_arg = star_node.args.get("this")
         if this_arg is not None:
             qualifier = safe_name(this_arg) or ""
 
@@ -160,14 +207,14 @@ def resolve_star(
         db, table, table_alias, enclosing_alias, global_scope
     )
 
-    return [{
-        "databaseName": db,
-        "tableName": table,
-        "tableAliasName": table_alias,
-        "columnName": "*",
-        "aliasName": "",
-        "regulation": regulation,
-        "metadatakey": metadatakey,
-        "viewName": view_name,
-        "remarks": [REMARKS["ALL_COLUMNS"]],
-    }]
+    return [LineageRow(
+        db,
+        table,
+        table_alias,
+        "*",
+        "",
+        regulation,
+        metadatakey,
+        view_name,
+        [_R_ALL_COLUMNS],
+    )]
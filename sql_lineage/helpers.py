@@ -1,13 +1,26 @@
 """
 Select-list and context helpers for SQL lineage (v2).
 """
-from typing import Optional, Tuple
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from sqlglot import exp
 
+from constants import REMARKS
+from scope import ScopeEntry, _FROM_KEY
 
-def extract_select_list(select_exp):
-    """Return list of (sql_text, alias, node) for each projection in the SELECT list."""
+# Remark labels returned by resolve_column, bound once at import
+_R_COL_WITH_DB = REMARKS["COLUMN_SELECTED_WITH_DB"]
+_R_NO_DB = REMARKS["DATABASE_NOT_SPECIFIED"]
+_R_INVALID_ALIAS = REMARKS["INVALID_TABLE_ALIAS"]
+_R_AMBIGUOUS = REMARKS["TABLE_AMBIGUOUS"]
+
+
+def extract_select_list(select_exp: exp.Select) -> List[Tuple[Optional[str], exp.Expression]]:
+    """
+    Return list of (alias, node) for each projection in the SELECT list.
+    SQL text is not rendered here; call node.sql() where it is actually needed.
+    """
     projections = []
     for proj in select_exp.expressions:
         alias = None
@@ -15,29 +28,99 @@ def extract_select_list(select_exp):
         if isinstance(proj, exp.Alias):
             alias = proj.alias_or_name
             node = proj.this
-        projections.append((str(node), alias, node))
+        projections.append((alias, node))
     return projections
 
 
+def _ancestors(node: exp.Expression) -> Iterator[exp.Expression]:
+    """Yield the parents of node, nearest first."""
+    parent = node.parent
+    while parent is not None:
+        yield parent
+        parent = parent.parent
+
+
 def _nearest_subquery_alias(select_node: exp.Select) -> Optional[str]:
     """
     Finds the alias of the nearest enclosing Subquery for a given Select, if any.
     Useful for tagging outer/inner layers (e.g., TSR_TS_DATA).
     """
-    parent_subq = select_node.parent
-    while parent_subq and not isinstance(parent_subq, exp.Subquery):
-        parent_subq = parent_subq.parent
-    if isinstance(parent_subq, exp.Subquery):
-        return parent_subq.alias_or_name if parent_subq.args.get("alias") else None
+    for parent_subq in _ancestors(select_node):
+        if isinstance(parent_subq, exp.Subquery):
+            return parent_subq.alias or None
     return None
 
 
+def build_select_context(ast_root: exp.Expression) -> Dict[int, Tuple[bool, bool, Optional[str]]]:
+    """
+    Single top-down walk over the AST.
+    Returns id(select) -> (is_outermost, inside_join, nearest_subquery_alias),
+    replacing the per-clause ``while parent`` walks up the tree.
+    """
+    context: Dict[int, Tuple[bool, bool, Optional[str]]] = {}
+    # (node, has_select_ancestor, has_join_ancestor, nearest_subquery_alias)
+    stack = [(ast_root, False, False, None)]
+    while stack:
+        node, in_select, in_join, subq_alias = stack.pop()
+        # Select / Join / Subquery have no subclasses: exact type tests per visited node
+        node_type = type(node)
+        if node_type is exp.Select:
+            context[id(node)] = (not in_select, in_join, subq_alias)
+            in_select = True
+        elif node_type is exp.Join:
+            in_join = True
+        elif node_type is exp.Subquery:
+            subq_alias = node.alias or None
+        for child in node.iter_expressions():
+            stack.append((child, in_select, in_join, subq_alias))
+    return context
+
+
+def collect_clause_columns(select: exp.Select) -> Dict[int, List[exp.Column]]:
+    """
+    One BFS over all clause roots of a SELECT (projections, WHERE, GROUP BY items,
+    HAVING, JOIN ON). Returns id(clause_root) -> Column nodes under that root, in
+    the same order find_all(exp.Column) would yield them. For the filter roots
+    (WHERE, GROUP BY, HAVING, ON) the walk stops at nested queries (subqueries,
+    EXISTS selects, set operations): their columns belong to that query's own
+    SELECT, which is processed separately. Projections are walked in full, so a
+    scalar subquery still feeds its outer alias.
+    """
+    filter_roots = [select.args.get("where")]
+    group = select.args.get("group")
+    if group:
+        filter_roots.extend(group.expressions)
+    filter_roots.append(select.args.get("having"))
+    for j in (select.args.get("joins") or ()):
+        filter_roots.append(j.args.get("on"))
+
+    buckets: Dict[int, List[exp.Column]] = {}
+    queue = deque()
+    for proj in select.expressions:
+        root = proj.this if isinstance(proj, exp.Alias) else proj
+        if isinstance(root, exp.Expression):
+            queue.append((root, buckets.setdefault(id(root), []), False))
+    for root in filter_roots:
+        if isinstance(root, exp.Expression):
+            queue.append((root, buckets.setdefault(id(root), []), True))
+    # FIFO order keeps each root's columns in its own BFS order
+    while queue:
+        node, bucket, stop_at_query = queue.popleft()
+        if isinstance(node, exp.Column):
+            bucket.append(node)
+        elif stop_at_query and isinstance(node, exp.Query):
+            continue
+        for child in node.iter_expressions():
+            queue.append((child, bucket, stop_at_query))
+    return buckets
+
+
 def get_outer_derived_table(select: exp.Select) -> Tuple[Optional[str], Optional[str]]:
     """
     Returns (table_name, table_alias) for:
       SELECT ... FROM ( SELECT ... ) TSR_TS_DATA
     """
-    from_node = select.args.get("from")
+    from_node = select.args.get(_FROM_KEY)
     if not from_node:
         return None, None
 
@@ -47,9 +130,43 @@ def get_outer_derived_table(select: exp.Select) -> Tuple[Optional[str], Optional
     return None, None
 
 
+def resolve_column(
+    qualifier: Optional[str],
+    from_scope: Dict[str, ScopeEntry],
+    local_scope: Optional[Dict[str, ScopeEntry]],
+    is_ambiguous: bool = False,
+) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+    """
+    Resolve a column qualifier against the global FROM scope.
+
+    Order: qualifier in from_scope, sole from_scope entry, sole local_scope source.
+    Returns (db, table, table_alias, remark). remark is COLUMN_SELECTED_WITH_DB /
+    DATABASE_NOT_SPECIFIED when resolved, INVALID_TABLE_ALIAS for an unknown
+    qualifier, TABLE_AMBIGUOUS (if is_ambiguous) or None when unresolved.
+    """
+    # One hash lookup for the qualifier; the fallbacks only run when it misses
+    entry = from_scope.get(qualifier) if qualifier else None
+    if entry is None:
+        if len(from_scope) == 1:
+            entry = next(iter(from_scope.values()))
+        elif local_scope and len(local_scope) == 1:
+            # Single source in this SELECT (e.g. FROM cte_name); resolve via global scope
+            entry = from_scope.get(next(iter(local_scope)))
+        elif qualifier:
+            # Qualified column but alias not found -> NOT ambiguous
+            return "", "", qualifier, _R_INVALID_ALIAS
+
+    if entry is None:
+        return "", "", "", _R_AMBIGUOUS if is_ambiguous else None
+
+    db = entry.db
+    return db, entry.table, entry.alias, (_R_COL_WITH_DB if db else _R_NO_DB)
+
+
 def is_function_only_expression(expr: exp.Expression) -> bool:
     """True if expr is a function (or anonymous) and contains no column references."""
     return (
         isinstance(expr, (exp.Func, exp.Anonymous))
-        and not list(expr.find_all(exp.Column))
+        # stop at the first Column instead of materializing them all
+        and next(expr.find_all(exp.Column), None) is None
     )
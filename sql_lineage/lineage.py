@@ -1,37 +1,270 @@
 """
 Core SQL lineage extraction.
 """
-from typing import Dict, List
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import sqlglot
 from sqlglot import exp
 
-from constants import REMARKS, OUTPUT_KEYS
-from utils import ensure_list, extract_columns_from_expression, safe_name
-from scope import build_from_scope_map, build_select_scope_map, _pick_base_table_from_subquery
+from constants import REMARKS
+from utils import safe_name
+from scope import (
+    ScopeEntry,
+    build_from_scope_map,
+    build_select_scope_map,
+    reset_caches,
+    _FROM_KEY,
+    _pick_base_table_from_query,
+)
 from helpers import (
     extract_select_list,
-    _nearest_subquery_alias,
+    build_select_context,
+    collect_clause_columns,
     get_outer_derived_table,
-    is_function_only_expression,
+    resolve_column,
 )
-from emit import emit_dataset_lineage, resolve_star, _emit_column_lineage
-
-
-def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name: str) -> List[Dict]:
-    """Parse SQL and extract all column/table lineage rows; returns normalized list of dicts."""
+from emit import LineageRow, emit_dataset_lineage, resolve_star, _emit_column_lineage
+
+
+# Remark labels bound once at import; read on every column in the hot loop
+_R_COL_WITH_DB = REMARKS["COLUMN_SELECTED_WITH_DB"]
+_R_NO_DB = REMARKS["DATABASE_NOT_SPECIFIED"]
+_R_INVALID_ALIAS = REMARKS["INVALID_TABLE_ALIAS"]
+_R_ALL_COLUMNS = REMARKS["ALL_COLUMNS"]
+_R_DERIVED = REMARKS["DERIVED_EXPR"]
+_R_CASE = REMARKS["CASE_EXPR"]
+_R_FUNCTION = REMARKS.get("FUNCTION_EXPR")
+_R_WHERE = REMARKS["WHERE_COLUMN"]
+_R_GROUP_BY = REMARKS["GROUP_BY_COLUMN"]
+_R_HAVING = REMARKS["HAVING_COLUMN"]
+_R_JOIN_ON = REMARKS["JOIN_ON_COLUMN"]
+_R_JOIN_TYPE = REMARKS["JOIN_TYPE"]
+_R_JOIN_SUBQUERY_WHERE = REMARKS["JOIN_SUBQUERY_WHERE_COLUMN"]
+
+
+def _as_str(value: object) -> str:
+    """Output cell value: str(value), with None -> ""."""
+    return str(value) if value is not None else ""
+
+
+@lru_cache(maxsize=64)
+def _join_type_tag(kind: str) -> str:
+    """JOIN type remark ("join_type:INNER", ...), formatted and interned once per kind."""
+    return sys.intern(f"{_R_JOIN_TYPE}:{kind.upper()}")
+
+
+@lru_cache(maxsize=1024)
+def _parse(sql: str, spark: bool = False) -> Optional[exp.Expression]:
+    """
+    Parse SQL text, cached by (sql, dialect) so repeated views skip sqlglot parsing.
+    The returned AST is shared between calls; extraction only reads it, never mutates it.
+    """
+    if spark:
+        return sqlglot.parse_one(sql, dialect="spark", error_level="ignore")
+    return sqlglot.parse_one(sql)
+
+
+def _is_single_table_select(ast: exp.Expression, selects: List[exp.Select], from_scope: Dict[str, ScopeEntry]) -> bool:
+    """
+    Fast-path eligibility: the whole query is one SELECT over one base table,
+    with no JOINs and only plain (optionally aliased) column projections.
+    """
+    if len(selects) != 1 or selects[0] is not ast or len(from_scope) != 1:
+        return False
+    if ast.args.get("joins") or isinstance(next(iter(from_scope.values())).node, exp.Subquery):
+        return False
+    return all(
+        isinstance(proj.this if isinstance(proj, exp.Alias) else proj, exp.Column)
+        for proj in ast.expressions
+    )
+
+
+def _sole_entry_cells(entry: ScopeEntry) -> Tuple[str, str, str, str]:
+    """Output (db, table, table_alias) cells and db remark for a column resolved to entry."""
+    return (
+        entry.db_lc,
+        entry.table_lc,
+        "" if entry.table == entry.alias else entry.alias_lc,
+        _R_COL_WITH_DB if entry.db else _R_NO_DB,
+    )
+
+
+def _single_table_rows(
+    select: exp.Select,
+    from_scope: Dict[str, ScopeEntry],
+    regulation: str,
+    metadatakey: str,
+    view_name: str,
+) -> List[LineageRow]:
+    """
+    Rows for a query accepted by _is_single_table_select. Every column resolves to the
+    sole scope entry, so no local scope, select context, JOIN or subquery handling is needed.
+    """
+    db_out, table_out, table_alias_out, db_remark = _sole_entry_cells(next(iter(from_scope.values())))
+
+    rows: List[LineageRow] = []
+    for proj in select.expressions:
+        col_alias = None
+        col_node = proj
+        if isinstance(proj, exp.Alias):
+            col_alias = proj.alias_or_name
+            col_node = proj.this
+        column_name = col_node.name
+        remarks = [db_remark]
+        if column_name == "*":
+            remarks.append(_R_ALL_COLUMNS)
+        rows.append(LineageRow(
+            db_out,
+            table_out,
+            table_alias_out,
+            str(column_name or "").lower(),
+            str(col_alias or "").lower(),
+            regulation,
+            metadatakey,
+            view_name,
+            remarks,
+        ))
+
+    # WHERE / GROUP BY / HAVING still go through _emit_column_lineage for invalid/derived handling
+    columns_by_clause = collect_clause_columns(select)
+    sargs = select.args
+    group_expr = sargs.get("group")
+    clauses = [(sargs.get("where"), _R_WHERE)]
+    if group_expr:
+        clauses.extend((g, _R_GROUP_BY) for g in group_expr.expressions)
+    clauses.append((sargs.get("having"), _R_HAVING))
+    for expr_node, remark_key in clauses:
+        if not expr_node:
+            continue
+        for col in columns_by_clause.get(id(expr_node), []):
+            _emit_column_lineage(
+                rows, col.table, col.name, from_scope,
+                regulation, metadatakey, view_name,
+                [remark_key],
+            )
+    return rows
+
+
+def _is_function_only_select(select: exp.Select, columns_by_clause: Dict[int, List[exp.Column]]) -> bool:
+    """
+    True for a SELECT with no FROM / JOIN sources and no column references anywhere
+    (e.g. SELECT current_date()): nothing can resolve, so only function rows are emitted.
+    """
+    sargs = select.args
+    if sargs.get(_FROM_KEY) or sargs.get("joins"):
+        return False
+    if any(columns_by_clause.values()):
+        return False
+    return not any(isinstance(proj, exp.Star) for proj in select.expressions)
+
+
+def _function_only_rows(
+    select: exp.Select,
+    regulation: str,
+    metadatakey: str,
+    view_name: str,
+) -> List[LineageRow]:
+    """Rows for a SELECT accepted by _is_function_only_select: one per function projection."""
+    rows: List[LineageRow] = []
+    for col_alias, col_node in extract_select_list(select):
+        if isinstance(col_node, (exp.Func, exp.Anonymous)):
+            rows.append(LineageRow(
+                "",
+                "",
+                "",
+                col_node.sql().lower(),
+                str(col_alias or "").lower(),
+                regulation,
+                metadatakey,
+                view_name,
+                [_R_DERIVED, _R_FUNCTION],
+            ))
+    return rows
+
+
+class _DedupRowBuffer(list):
+    """
+    Result buffer that drops a row identical to one already appended, so duplicates
+    never accumulate. regulation / metadatakey / view_name are per-query constants,
+    so they are not part of the key. Rows must not be mutated after they are appended.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._seen = set()
+
+    def append(self, row: LineageRow) -> None:
+        key = (row.db, row.table, row.table_alias, row.column, row.alias, tuple(row.remarks))
+        # add() and a size check hash the key once, where "not in" + add() hash it twice
+        seen = self._seen
+        size = len(seen)
+        seen.add(key)
+        if len(seen) != size:
+            super().append(row)
+
+    def extend(self, rows) -> None:
+        for row in rows:
+            self.append(row)
+
+
+def _iter_output(results: List[LineageRow]) -> Iterator[Dict]:
+    """Lay buffered rows out as OUTPUT_KEYS dicts, one at a time."""
+    # Output rows (OUTPUT_KEYS order); values need no further normalization
+    for r in results:
+        yield {
+            "databaseName": r.db,
+            "tableName": r.table,
+            "tableAliasName": r.table_alias,
+            "columnName": r.column,
+            "aliasName": r.alias,
+            "regulation": r.regulation,
+            "metadatakey": r.metadatakey,
+            "viewName": r.view_name,
+            "remarks": r.remarks,
+        }
+
+
+def extract_lineage_rows(
+    sql: str,
+    regulation: str,
+    metadatakey: str,
+    view_name: str,
+    dedupe: bool = True,
+) -> List[Dict]:
+    """
+    Parse SQL and extract all column/table lineage rows; returns normalized list of dicts.
+    With dedupe (default) identical rows are kept once, first occurrence wins.
+    """
+    return list(iter_lineage_rows(sql, regulation, metadatakey, view_name, dedupe))
+
+
+def iter_lineage_rows(
+    sql: str,
+    regulation: str,
+    metadatakey: str,
+    view_name: str,
+    dedupe: bool = True,
+) -> Iterator[Dict]:
+    """
+    Same rows as extract_lineage_rows, yielded one dict at a time. Extraction runs on
+    the first next(); only the compact row buffer is held, never a full list of dicts.
+    """
+    reset_caches()
     try:
-        ast = sqlglot.parse_one(sql, dialect="spark", error_level="ignore")
+        ast = _parse(sql, spark=True)
     except Exception as err:
         print("Testing fallback with dialect='spark' due to parse error:", err)
         ast = None
 
     try:
         if ast is None:
-            ast = sqlglot.parse_one(sql)
+            ast = _parse(sql)
     except Exception as err:
         print("Final parse failure:", err)
-        return [{
+        yield {
             "databaseName": "",
             "tableName": "",
             "tableAliasName": "",
@@ -41,40 +274,74 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
             "metadatakey": metadatakey,
             "viewName": view_name,
             "remarks": [REMARKS["TECH_FAILURE"]],
-        }]
+        }
+        return
+
+    # Rows are built in canonical form at the emit sites: every cell is already a str and
+    # remarks a list, so only the per-query values need stringifying (once, here).
+    regulation, metadatakey, view_name = _as_str(regulation), _as_str(metadatakey), _as_str(view_name)
 
-    results: List[Dict] = []
+    # Deduplicated at append time unless the caller wants raw emission order
+    results: List[LineageRow] = _DedupRowBuffer() if dedupe else []
     results.extend(emit_dataset_lineage(ast, regulation, metadatakey, view_name))
 
     # Global scope for all selects / aliases in the query
-    from_scope = build_from_scope_map(ast)
+    root_scope = build_from_scope_map(ast)
     selects = list(ast.find_all(exp.Select))
 
-    def process_node(node):
-        """Process UNION nodes recursively, or process SELECT nodes."""
-        if isinstance(node, exp.Union):
-            # Process UNION nodes
-            process_node(node.this)        # left SELECT
-            process_node(node.expression)  # right SELECT
-        else:
-            from_scope = build_from_scope_map(node)
-            selects_local = list(node.find_all(exp.Select))
-            process_bau(selects_local, from_scope)
-
-    def process_bau(selects_in, from_scope):
+    # Fast path: single-table SELECT skips the generic scope / context machinery
+    if _is_single_table_select(ast, selects, root_scope):
+        results.extend(_single_table_rows(ast, root_scope, regulation, metadatakey, view_name))
+        yield from _iter_output(results)
+        return
+
+    # id(select) -> (is_outermost, inside_join, nearest_subquery_alias), one walk per AST
+    select_context = build_select_context(ast)
+    # id(select) -> {id(clause_root): [Column, ...]}, filled lazily once per SELECT
+    clause_cache: Dict[int, Dict[int, List[exp.Column]]] = {}
+
+    def clause_columns(select: exp.Select) -> Dict[int, List[exp.Column]]:
+        """Column buckets for a SELECT's clauses, computed with a single walk and cached."""
+        buckets = clause_cache.get(id(select))
+        if buckets is None:
+            buckets = clause_cache[id(select)] = collect_clause_columns(select)
+        return buckets
+
+    def process_bau(selects_in: List[exp.Select], from_scope: Dict[str, ScopeEntry]) -> None:
         """Process SELECT statements: extract lineage from SELECT list, WHERE, GROUP BY, HAVING, and JOINs."""
+        # Unqualified columns are ambiguous when the scope has several base (non-subquery) tables
+        base_tables_count = sum(1 for v in from_scope.values() if not isinstance(v.node, exp.Subquery))
+        is_ambiguous = base_tables_count > 1
+        # With a single scope entry every direct column resolves to it (resolve_column's
+        # sole-entry rule), so its output cells and remark are fixed for the whole scope
+        single_source = _sole_entry_cells(next(iter(from_scope.values()))) if len(from_scope) == 1 else None
+
         for select in selects_in:
+            columns_by_clause = clause_columns(select)
+            # No sources and no columns (e.g. SELECT current_date()): skip scope resolution
+            if _is_function_only_select(select, columns_by_clause):
+                results.extend(_function_only_rows(select, regulation, metadatakey, view_name))
+                continue
+
             # local scope for this select only (FROM+JOIN)
             local_scope = build_select_scope_map(select)
-            enclosing_alias = _nearest_subquery_alias(select)
+            is_outermost, inside_join, enclosing_alias = select_context[id(select)]
+            sargs = select.args
+            where_expr = sargs.get("where")
+            group_expr = sargs.get("group")
+            having_expr = sargs.get("having")
+            joins = sargs.get("joins") or ()
 
             # ------------------------------------------------
             # 1) SELECT list
             # ------------------------------------------------
-            for col_text, col_alias, col_node in extract_select_list(select):
+            for col_alias, col_node in extract_select_list(select):
+                # Star and Case have no subclasses, so an exact type test is enough;
+                # Column keeps isinstance because Pseudocolumn derives from it
+                node_type = type(col_node)
 
                 # STAR
-                if isinstance(col_node, exp.Star):
+                if node_type is exp.Star:
                     results.extend(
                         resolve_star(
                             col_node,
@@ -90,191 +357,141 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
 
                 # Direct column
                 if isinstance(col_node, exp.Column):
-                    qualifier = col_node.table
                     column_name = col_node.name
-                    db = ""
-                    table = ""
-                    table_alias = ""
-                    remarks = []
-
-                    if qualifier and qualifier in from_scope:
-                        _, db, table, table_alias = from_scope[qualifier]
-                        remarks.append(
-                            REMARKS["COLUMN_SELECTED_WITH_DB"] if db else REMARKS["DATABASE_NOT_SPECIFIED"]
-                        )
-                    elif len(from_scope) == 1:
-                        _, db, table, table_alias = next(iter(from_scope.values()))
-                        remarks.append(
-                            REMARKS["COLUMN_SELECTED_WITH_DB"] if db else REMARKS["DATABASE_NOT_SPECIFIED"]
-                        )
-                    elif local_scope and len(local_scope) == 1:
-                        # Single source in this SELECT (e.g. FROM cte_name); resolve via global scope
-                        key = next(iter(local_scope.keys()))
-                        if key in from_scope:
-                            _, db, table, table_alias = from_scope[key]
-                            remarks.append(
-                                REMARKS["COLUMN_SELECTED_WITH_DB"] if db else REMARKS["DATABASE_NOT_SPECIFIED"]
-                            )
-                        else:
-                            base_tables = [
-                                v for v in from_scope.values()
-                                if not isinstance(v[0], exp.Subquery)
-                            ]
-                            if len(base_tables) > 1:
-                                remarks.append(REMARKS["TABLE_AMBIGUOUS"])
-                    else:
-                        if qualifier:
-                            # Qualified column but alias not found -> NOT ambiguous
-                            remarks.append(REMARKS["INVALID_TABLE_ALIAS"])
-                            table = ""
-                            table_alias = qualifier
-                            db = ""
-                        else:
-                            # Unqualified with multiple base tables -> ambiguous
-                            base_tables = [
-                                v for v in from_scope.values()
-                                if not isinstance(v[0], exp.Subquery)
-                            ]
-                            if len(base_tables) > 1:
-                                remarks.append(REMARKS["TABLE_AMBIGUOUS"])
+                    if single_source is not None:
+                        db_out, table_out, table_alias_out, remark = single_source
+                        remarks = [remark]
+                        if column_name == "*":
+                            remarks.append(_R_ALL_COLUMNS)
+                        results.append(LineageRow(
+                            db_out,
+                            table_out,
+                            table_alias_out,
+                            str(column_name or "").lower(),
+                            str(col_alias or "").lower(),
+                            regulation,
+                            metadatakey,
+                            view_name,
+                            remarks,
+                        ))
+                        continue
+
+                    qualifier = col_node.table
+                    db, table, table_alias, remark = resolve_column(
+                        qualifier, from_scope, local_scope, is_ambiguous
+                    )
+                    remarks = [remark] if remark else []
 
                     # Emit using helper (will capture invalid alias / derived)
                     if table == table_alias:
                         table_alias = ""
                     if column_name == "*":
-                        remarks.append(REMARKS["ALL_COLUMNS"])
-                    results.append({
-                        "databaseName": str(db or "").lower(),
-                        "tableName": str(table or "").lower(),
-                        "tableAliasName": str(table_alias or "").lower(),
-                        "columnName": str(column_name or "").lower(),
-                        "aliasName": str(col_alias or "").lower(),
-                        "regulation": regulation,
-                        "metadatakey": metadatakey,
-                        "viewName": view_name,
-                        "remarks": remarks,
-                    })
+                        remarks.append(_R_ALL_COLUMNS)
+                    results.append(LineageRow(
+                        str(db or "").lower(),
+                        str(table or "").lower(),
+                        str(table_alias or "").lower(),
+                        str(column_name or "").lower(),
+                        str(col_alias or "").lower(),
+                        regulation,
+                        metadatakey,
+                        view_name,
+                        remarks,
+                    ))
                     continue
 
                 # Derived / CASE expressions
-                derived_columns = extract_columns_from_expression(col_node)
+                derived_columns = columns_by_clause.get(id(col_node), [])
                 if derived_columns:
+                    is_case = node_type is exp.Case
                     for dcol in derived_columns:
                         qualifier = dcol.table
                         column_name = dcol.name
-                        db = ""
-                        table = ""
-                        table_alias = ""
-                        remarks = [REMARKS["DERIVED_EXPR"]]
-
-                        # Normal qualified resolution
-                        if qualifier and qualifier in from_scope:
-                            _, db, table, table_alias = from_scope[qualifier]
-                        elif len(from_scope) == 1:
-                            _, db, table, table_alias = next(iter(from_scope.values()))
-                        elif local_scope and len(local_scope) == 1:
-                            key = next(iter(local_scope.keys()))
-                            if key in from_scope:
-                                _, db, table, table_alias = from_scope[key]
-                        elif qualifier:
-                            remarks.append(REMARKS["INVALID_TABLE_ALIAS"])
-                            table = ""
-                            table_alias = qualifier
-                        else:
+                        remarks = [_R_DERIVED]
+
+                        db, table, table_alias, remark = resolve_column(qualifier, from_scope, local_scope)
+                        if remark == _R_INVALID_ALIAS:
+                            remarks.append(remark)
+                        elif remark is None and is_outermost:
                             # NEW: outermost derived SELECT fallback (CASE in outermost select)
-                            parent = select.parent
-                            while parent:
-                                if isinstance(parent, exp.Select):
-                                    break
-                                parent = parent.parent
-                            else:
-                                # outermost SELECT
-                                table, table_alias = get_outer_derived_table(select)
-                                
-
-                        if isinstance(col_node, exp.Case):
-                            remarks.append(REMARKS["CASE_EXPR"])
+                            table, table_alias = get_outer_derived_table(select)
+
+                        if is_case:
+                            remarks.append(_R_CASE)
                             if table:
                                 remarks.append("table name Derived")
 
                         if table == table_alias:
                             table_alias = ""
 
-                        results.append({
-                            "databaseName": str(db or "").lower(),
-                            "tableName": str(table or "").lower(),
-                            "tableAliasName": str(table_alias or "").lower(),
-                            "columnName": str(column_name or "").lower(),
-                            "aliasName": str(col_alias or "").lower(),
-                            "regulation": regulation,
-                            "metadatakey": metadatakey,
-                            "viewName": view_name,
-                            "remarks": remarks,
-                        })
+                        results.append(LineageRow(
+                            str(db or "").lower(),
+                            str(table or "").lower(),
+                            str(table_alias or "").lower(),
+                            str(column_name or "").lower(),
+                            str(col_alias or "").lower(),
+                            regulation,
+                            metadatakey,
+                            view_name,
+                            remarks,
+                        ))
                 else:
-                    # Function-only expression
-                    if is_function_only_expression(col_node):
+                    # Function-only expression: the cached bucket already shows there are no
+                    # columns under col_node, so only the node type needs checking
+                    if isinstance(col_node, (exp.Func, exp.Anonymous)):
                         # Fix: use col_node.sql() instead of undefined col_sql
-                        results.append({
-                            "databaseName": "",
-                            "tableName": "",
-                            "tableAliasName": "",
-                            "columnName": str(col_node.sql()).lower(),
-                            "aliasName": str(col_alias or "").lower(),
-                            "regulation": regulation,
-                            "metadatakey": metadatakey,
-                            "viewName": view_name,
-                            "remarks": [
-                                REMARKS["DERIVED_EXPR"],
-                                REMARKS.get("FUNCTION_EXPR"),
+                        results.append(LineageRow(
+                            "",
+                            "",
+                            "",
+                            str(col_node.sql()).lower(),
+                            str(col_alias or "").lower(),
+                            regulation,
+                            metadatakey,
+                            view_name,
+                            [
+                                _R_DERIVED,
+                                _R_FUNCTION,
                             ],
-                        })
+                        ))
 
             # ------------------------------------------------
             # 2) WHERE / GROUP BY / HAVING lineage
             #     (skip expressions under JOIN nodes)
             # ------------------------------------------------
-            def process_clause(expr_node, remark_key):
+            def process_clause(expr_node: Optional[exp.Expression], remark_key: str) -> None:
                 if not expr_node:
                     return
 
-                parent = select.parent
-                while parent:
-                    if isinstance(parent, exp.Join):
-                        break
-                    parent = parent.parent
-                else:
-                    for wcol in extract_columns_from_expression(expr_node):
-                        _emit_column_lineage(
-                            results=results,
-                            qualifier=wcol.table,
-                            column_name=wcol.name,
-                            from_scope=from_scope,
-                            regulation=regulation,
-                            metadatakey=metadatakey,
-                            view_name=view_name,
-                            remark_list=[remark_key],
-                            fallback_alias=enclosing_alias,
-                            local_scope=local_scope,
-                        )
+                for wcol in columns_by_clause.get(id(expr_node), []):
+                    # Positional call: this is the per-column hot path
+                    _emit_column_lineage(
+                        results, wcol.table, wcol.name, from_scope,
+                        regulation, metadatakey, view_name,
+                        [remark_key],
+                        enclosing_alias,  # fallback_alias
+                        None, None,       # explicit_table_name / explicit_table_alias
+                        local_scope,
+                    )
 
-            process_clause(select.args.get("where"), REMARKS["WHERE_COLUMN"])
+            # Join context is precomputed per SELECT; skip all clause dispatch under a JOIN
+            if not inside_join:
+                process_clause(where_expr, _R_WHERE)
 
-            if select.args.get("group"):
-                for g in select.args["group"].expressions:
-                    process_clause(g, REMARKS["GROUP_BY_COLUMN"])
+                if group_expr:
+                    for g in group_expr.expressions:
+                        process_clause(g, _R_GROUP_BY)
 
-            process_clause(select.args.get("having"), REMARKS["HAVING_COLUMN"])
+                process_clause(having_expr, _R_HAVING)
 
             # ------------------------------------------------
             # 3) JOIN lineage
             #    (inner select may carry joins even when the outer FROM is a subquery)
             # ------------------------------------------------
-            joins = select.args.get("joins") or []
             for j in joins:
                 # join type
                 kind = j.args.get("kind") or "INNER"
-                join_type_tag = f"{REMARKS['JOIN_TYPE']}:{str(kind).upper()}"
+                join_type_tag = _join_type_tag(str(kind))
 
                 # ON clause and right-side node alias (table or subquery alias)
                 on_expr = j.args.get("on")
@@ -282,67 +499,20 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                 right_alias = None
 
                 if isinstance(right_node, (exp.Table, exp.Subquery, exp.Alias)):
-                    right_alias = getattr(right_node, "alias_or_name", None)
+                    right_alias = right_node.alias_or_name
                     if not right_alias and isinstance(right_node, exp.Table):
                         right_alias = safe_name(right_node.this)
 
-                # 3a) ON columns
+                # 3a) ON columns (covers both sides of a.col = b.col equality pairs)
                 if on_expr:
-                    for c in extract_columns_from_expression(on_expr):
+                    for c in columns_by_clause.get(id(on_expr), []):
                         _emit_column_lineage(
-                            results=results,
-                            qualifier=c.table,
-                            column_name=c.name,
-                            from_scope=from_scope,
-                            regulation=regulation,
-                            metadatakey=metadatakey,
-                            view_name=view_name,
-                            remark_list=[REMARKS["JOIN_ON_COLUMN"], join_type_tag],
-                            fallback_alias=right_alias,  # use JOIN alias if column is unqualified
+                            results, c.table, c.name, from_scope,
+                            regulation, metadatakey, view_name,
+                            [_R_JOIN_ON, join_type_tag],
+                            right_alias,  # use JOIN alias if column is unqualified
                         )
 
-                    # 3b) Equality pairs a.col = b.col
-                    for eq in on_expr.find_all(exp.EQ):
-                        left = getattr(eq, "this", None)
-                        right = getattr(eq, "expression", None)
-
-                        left_sql = left.sql() if isinstance(left, exp.Expression) else str(left)
-                        right_sql = right.sql() if isinstance(right, exp.Expression) else str(right)
-
-                        # per-side lineage (both sides)
-                        if isinstance(left, exp.Column):
-                            _emit_column_lineage(
-                                results=results,
-                                qualifier=left.table,
-                                column_name=left.name,
-                                from_scope=from_scope,
-                                regulation=regulation,
-                                metadatakey=metadatakey,
-                                view_name=view_name,
-                                remark_list=[
-                                    REMARKS["JOIN_ON_COLUMN"],
-                                    join_type_tag,
-                                    # f"{REMARKS['JOIN_EQ_PAIR']}:{left_sql}={right_sql}",
-                                ],
-                                fallback_alias=right_alias,
-                            )
-                        if isinstance(right, exp.Column):
-                            _emit_column_lineage(
-                                results=results,
-                                qualifier=right.table,
-                                column_name=right.name,
-                                from_scope=from_scope,
-                                regulation=regulation,
-                                metadatakey=metadatakey,
-                                view_name=view_name,
-                                remark_list=[
-                                    REMARKS["JOIN_ON_COLUMN"],
-                                    join_type_tag,
-                                    # f"{REMARKS['JOIN_EQ_PAIR']}:{left_sql}={right_sql}",
-                                ],
-                                fallback_alias=right_alias,
-                            )
-
                 # 3c) NEW: subquery WHERE inside JOIN (e.g., ROW_NUM)
                 if isinstance(right_node, exp.Subquery):
                     # The subquery usually wraps a Select in .this
@@ -350,34 +520,59 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                     if sub_select:
                         sub_where = sub_select.args.get("where")
                         if sub_where:
+                            sub_columns = clause_columns(sub_select).get(id(sub_where), [])
                             # Resolve base table of the subquery for accurate tableName
-                            sub_db, sub_base_table = _pick_base_table_from_subquery(right_node)
-                            for c in extract_columns_from_expression(sub_where):
+                            sub_db, sub_base_table = _pick_base_table_from_query(right_node)
+                            for c in sub_columns:
                                 _emit_column_lineage(
-                                    results=results,
-                                    qualifier=c.table,  # may be None
-                                    column_name=c.name,
-                                    from_scope=from_scope,
-                                    regulation=regulation,
-                                    metadatakey=metadatakey,
-                                    view_name=view_name,
-                                    remark_list=[REMARKS["JOIN_SUBQUERY_WHERE_COLUMN"], join_type_tag],
-                                    fallback_alias=right_alias,
-                                    explicit_table_name=sub_base_table,
-                                    explicit_table_alias=right_alias,
+                                    results, c.table, c.name, from_scope,  # qualifier may be None
+                                    regulation, metadatakey, view_name,
+                                    [_R_JOIN_SUBQUERY_WHERE, join_type_tag],
+                                    right_alias,     # fallback_alias
+                                    sub_base_table,  # explicit_table_name
+                                    right_alias,     # explicit_table_alias
                                 )
 
-    process_node(ast)
-
-    # 4) Normalize output rows
-    normalized: List[Dict] = []
-    for r in results:
-        row = {}
-        for k in OUTPUT_KEYS:
-            if k == "remarks":
-                row[k] = ensure_list(r.get(k))
-            else:
-                row[k] = str(r.get(k, "")) if r.get(k) is not None else ""
-        normalized.append(row)
-
-    return normalized
+    # UNION arms, left to right, with an explicit stack instead of recursion
+    pending: List[exp.Expression] = [ast]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, exp.Union):
+            pending.append(node.expression)  # right SELECT, after the whole left arm
+            pending.append(node.this)        # left SELECT
+        elif node is ast:
+            # Root scope and SELECT list were already built above; reuse them
+            process_bau(selects, root_scope)
+        else:
+            process_bau(list(node.find_all(exp.Select)), build_from_scope_map(node))
+
+    yield from _iter_output(results)
+
+
+def _warm_worker() -> None:
+    """Process-pool initializer: load the Spark dialect once per worker, not on the first task."""
+    sqlglot.parse_one("SELECT 1", dialect="spark")
+
+
+def _extract_lineage_item(item: Tuple[str, str, str, str]) -> List[Dict]:
+    """Process-pool worker: unpack one (sql, regulation, metadatakey, view_name) item."""
+    return extract_lineage_rows(*item)
+
+
+def extract_lineage_rows_batch(
+    items: Sequence[Tuple[str, str, str, str]],
+    max_workers: Optional[int] = None,
+    chunksize: int = 16,
+    executor: Optional[Executor] = None,
+) -> List[List[Dict]]:
+    """
+    Run extract_lineage_rows over many independent (sql, regulation, metadatakey, view_name)
+    items in a process pool. Returns one row list per item, in input order.
+    Pass a long-lived executor to reuse its warm workers across batches; it is not shut down here.
+    """
+    if not items:
+        return []
+    if executor is not None:
+        return list(executor.map(_extract_lineage_item, items, chunksize=chunksize))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_worker) as executor:
+        return list(executor.map(_extract_lineage_item, items, chunksize=chunksize))
@@ -9,14 +9,15 @@ from sqlglot import exp
 
 from sql_lineage.constants import REMARKS, OUTPUT_KEYS
 from sql_lineage.utils import ensure_list, extract_columns_from_expression, safe_name
-from sql_lineage.scope import build_from_scope_map, build_select_scope_map, _pick_base_table_from_subquery
+from sql_lineage.scope import build_from_scope_map, build_select_scope_map, reset_caches, _pick_base_table_from_query, _WITH_KEY
 from sql_lineage.helpers import (
     extract_select_list,
+    build_select_context,
     _nearest_subquery_alias,
     get_outer_derived_table,
     is_function_only_expression,
 )
-from sql_lineage.emit import emit_dataset_lineage, resolve_star, _emit_column_lineage
+from sql_lineage.emit import LineageRow, emit_dataset_lineage, resolve_star, _emit_column_lineage
 
 
 # ---------------------------------------------------------------------------
@@ -48,6 +49,9 @@ _DOUBLE_ALIAS_RE = re.compile(
     re.IGNORECASE,
 )
 
+# OUTPUT_KEYS minus "remarks"; remarks are normalized to a list separately
+_NON_REMARK_KEYS = tuple(k for k in OUTPUT_KEYS if k != "remarks")
+
 
 def _fix_double_alias(sql_text: str) -> str:
     """Rewrite  FROM tbl X Y  ->  FROM tbl AS X  when X and Y are both non-keyword tokens.
@@ -74,6 +78,7 @@ def _fix_double_alias(sql_text: str) -> str:
 
 def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name: str) -> List[Dict]:
     """Parse SQL and extract all column/table lineage rows; returns normalized list of dicts."""
+    reset_caches()
     # Bug Fix 1: normalise spurious double-alias patterns (e.g. "TABLE K A") before parsing
     sql = _fix_double_alias(sql)
 
@@ -100,13 +105,15 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
             "remarks": [REMARKS["TECH_FAILURE"]],
         }]
 
-    results: List[Dict] = []
+    results: List[LineageRow] = []
     results.extend(emit_dataset_lineage(ast, regulation, metadatakey, view_name))
 
     # Build root-level scope ONCE from the full AST so CTE chains resolve correctly.
     # Individual Union sub-nodes (e.g. Union.this) do NOT carry the WITH clause,
     # so calling build_from_scope_map on them loses all CTE-to-base-table mappings.
     root_scope = build_from_scope_map(ast)
+    # id(select) -> (is_outermost, inside_join, nearest_subquery_alias), one walk per AST
+    select_context = build_select_context(ast)
 
     def process_node(node, _root_ast=None):
         """Process UNION nodes recursively, or process SELECT nodes.
@@ -124,11 +131,11 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
         """
         if isinstance(node, exp.Union):
             # --- Fix 1: process every CTE body select FIRST ---
-            # The WITH node is attached to the top-level Union (ast.args["with_"]).
+            # The WITH node is attached to the top-level Union (ast.args[_WITH_KEY]).
             # We extract it once here so nested unions also benefit if they ever
             # carry their own CTEs.
-            with_node = node.args.get("with_") if hasattr(node, "args") else None
-            if with_node and getattr(with_node, "expressions", None):
+            with_node = node.args.get(_WITH_KEY)
+            if with_node and with_node.expressions:
                 for cte in with_node.expressions:
                     cte_body = cte.this  # Select (or nested Union) inside the CTE
                     # Collect all Select nodes inside this CTE body.
@@ -152,11 +159,12 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
             # local scope for this select only (FROM+JOIN)
             local_scope = build_select_scope_map(select)
             enclosing_alias = _nearest_subquery_alias(select)
+            is_outermost = select_context[id(select)][0]
 
             # ------------------------------------------------
             # 1) SELECT list
             # ------------------------------------------------
-            for col_text, col_alias, col_node in extract_select_list(select):
+            for col_alias, col_node in extract_select_list(select):
 
                 # STAR
                 if isinstance(col_node, exp.Star):
@@ -183,12 +191,14 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                     remarks = []
 
                     if qualifier and qualifier in from_scope:
-                        _, db, table, table_alias = from_scope[qualifier]
+                        entry = from_scope[qualifier]
+                        db, table, table_alias = entry.db, entry.table, entry.alias
                         remarks.append(
                             REMARKS["COLUMN_SELECTED_WITH_DB"] if db else REMARKS["DATABASE_NOT_SPECIFIED"]
                         )
                     elif len(from_scope) == 1:
-                        _, db, table, table_alias = next(iter(from_scope.values()))
+                        entry = next(iter(from_scope.values()))
+                        db, table, table_alias = entry.db, entry.table, entry.alias
                         remarks.append(
                             REMARKS["COLUMN_SELECTED_WITH_DB"] if db else REMARKS["DATABASE_NOT_SPECIFIED"]
                         )
@@ -196,14 +206,15 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                         # Single source in this SELECT (e.g. FROM cte_name); resolve via global scope
                         key = next(iter(local_scope.keys()))
                         if key in from_scope:
-                            _, db, table, table_alias = from_scope[key]
+                            entry = from_scope[key]
+                            db, table, table_alias = entry.db, entry.table, entry.alias
                             remarks.append(
                                 REMARKS["COLUMN_SELECTED_WITH_DB"] if db else REMARKS["DATABASE_NOT_SPECIFIED"]
                             )
                         else:
                             base_tables = [
                                 v for v in from_scope.values()
-                                if not isinstance(v[0], exp.Subquery)
+                                if not isinstance(v.node, exp.Subquery)
                             ]
                             if len(base_tables) > 1:
                                 remarks.append(REMARKS["TABLE_AMBIGUOUS"])
@@ -218,7 +229,7 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                             # Unqualified with multiple base tables -> ambiguous
                             base_tables = [
                                 v for v in from_scope.values()
-                                if not isinstance(v[0], exp.Subquery)
+                                if not isinstance(v.node, exp.Subquery)
                             ]
                             if len(base_tables) > 1:
                                 remarks.append(REMARKS["TABLE_AMBIGUOUS"])
@@ -228,17 +239,17 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                         table_alias = ""
                     if column_name == "*":
                         remarks.append(REMARKS["ALL_COLUMNS"])
-                    results.append({
-                        "databaseName": str(db or "").lower(),
-                        "tableName": str(table or "").lower(),
-                        "tableAliasName": str(table_alias or "").lower(),
-                        "columnName": str(column_name or "").lower(),
-                        "aliasName": str(col_alias or "").lower(),
-                        "regulation": regulation,
-                        "metadatakey": metadatakey,
-                        "viewName": view_name,
-                        "remarks": remarks,
-                    })
+                    results.append(LineageRow(
+                        str(db or "").lower(),
+                        str(table or "").lower(),
+                        str(table_alias or "").lower(),
+                        str(column_name or "").lower(),
+                        str(col_alias or "").lower(),
+                        regulation,
+                        metadatakey,
+                        view_name,
+                        remarks,
+                    ))
                     continue
 
                 # Derived / CASE expressions
@@ -254,28 +265,23 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
 
                         # Normal qualified resolution
                         if qualifier and qualifier in from_scope:
-                            _, db, table, table_alias = from_scope[qualifier]
+                            entry = from_scope[qualifier]
+                            db, table, table_alias = entry.db, entry.table, entry.alias
                         elif len(from_scope) == 1:
-                            _, db, table, table_alias = next(iter(from_scope.values()))
+                            entry = next(iter(from_scope.values()))
+                            db, table, table_alias = entry.db, entry.table, entry.alias
                         elif local_scope and len(local_scope) == 1:
                             key = next(iter(local_scope.keys()))
                             if key in from_scope:
-                                _, db, table, table_alias = from_scope[key]
+                                entry = from_scope[key]
+                                db, table, table_alias = entry.db, entry.table, entry.alias
                         elif qualifier:
                             remarks.append(REMARKS["INVALID_TABLE_ALIAS"])
                             table = ""
                             table_alias = qualifier
-                        else:
+                        elif is_outermost:
                             # NEW: outermost derived SELECT fallback (CASE in outermost select)
-                            parent = select.parent
-                            while parent:
-                                if isinstance(parent, exp.Select):
-                                    break
-                                parent = parent.parent
-                            else:
-                                # outermost SELECT
-                                table, table_alias = get_outer_derived_table(select)
-                                
+                            table, table_alias = get_outer_derived_table(select)
 
                         if isinstance(col_node, exp.Case):
                             remarks.append(REMARKS["CASE_EXPR"])
@@ -285,35 +291,35 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                         if table == table_alias:
                             table_alias = ""
 
-                        results.append({
-                            "databaseName": str(db or "").lower(),
-                            "tableName": str(table or "").lower(),
-                            "tableAliasName": str(table_alias or "").lower(),
-                            "columnName": str(column_name or "").lower(),
-                            "aliasName": str(col_alias or "").lower(),
-                            "regulation": regulation,
-                            "metadatakey": metadatakey,
-                            "viewName": view_name,
-                            "remarks": remarks,
-                        })
+                        results.append(LineageRow(
+                            str(db or "").lower(),
+                            str(table or "").lower(),
+                            str(table_alias or "").lower(),
+                            str(column_name or "").lower(),
+                            str(col_alias or "").lower(),
+                            regulation,
+                            metadatakey,
+                            view_name,
+                            remarks,
+                        ))
                 else:
                     # Function-only expression
                     if is_function_only_expression(col_node):
                         # Fix: use col_node.sql() instead of undefined col_sql
-                        results.append({
-                            "databaseName": "",
-                            "tableName": "",
-                            "tableAliasName": "",
-                            "columnName": str(col_node.sql()).lower(),
-                            "aliasName": str(col_alias or "").lower(),
-                            "regulation": regulation,
-                            "metadatakey": metadatakey,
-                            "viewName": view_name,
-                            "remarks": [
+                        results.append(LineageRow(
+                            "",
+                            "",
+                            "",
+                            str(col_node.sql()).lower(),
+                            str(col_alias or "").lower(),
+                            regulation,
+                            metadatakey,
+                            view_name,
+                            [
                                 REMARKS["DERIVED_EXPR"],
                                 REMARKS.get("FUNCTION_EXPR"),
                             ],
-                        })
+                        ))
 
             # ------------------------------------------------
             # 2) WHERE / GROUP BY / HAVING lineage
@@ -329,7 +335,7 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                         break
                     parent = parent.parent
                 else:
-                    for wcol in extract_columns_from_expression(expr_node):
+                    for wcol in extract_columns_from_expression(expr_node, stop_at_subquery=True):
                         _emit_column_lineage(
                             results=results,
                             qualifier=wcol.table,
@@ -373,7 +379,7 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
 
                 # 3a) ON columns
                 if on_expr:
-                    for c in extract_columns_from_expression(on_expr):
+                    for c in extract_columns_from_expression(on_expr, stop_at_subquery=True):
                         _emit_column_lineage(
                             results=results,
                             qualifier=c.table,
@@ -436,8 +442,8 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
                         sub_where = sub_select.args.get("where")
                         if sub_where:
                             # Resolve base table of the subquery for accurate tableName
-                            sub_db, sub_base_table = _pick_base_table_from_subquery(right_node)
-                            for c in extract_columns_from_expression(sub_where):
+                            sub_db, sub_base_table = _pick_base_table_from_query(right_node)
+                            for c in extract_columns_from_expression(sub_where, stop_at_subquery=True):
                                 _emit_column_lineage(
                                     results=results,
                                     qualifier=c.table,  # may be None
@@ -454,15 +460,12 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
 
     process_node(ast)
 
-    # 4) Normalize output rows
+    # 4) Normalize output rows: the only point where a dict is built per row
     normalized: List[Dict] = []
     for r in results:
-        row = {}
-        for k in OUTPUT_KEYS:
-            if k == "remarks":
-                row[k] = ensure_list(r.get(k))
-            else:
-                row[k] = str(r.get(k, "")) if r.get(k) is not None else ""
+        values = (r.db, r.table, r.table_alias, r.column, r.alias, r.regulation, r.metadatakey, r.view_name)
+        row = {k: (str(v) if v is not None else "") for k, v in zip(_NON_REMARK_KEYS, values)}
+        row["remarks"] = ensure_list(r.remarks)
         normalized.append(row)
 
     return normalized
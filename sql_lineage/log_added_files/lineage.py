@@ -18,6 +18,9 @@ from helpers import (
 from emit import emit_dataset_lineage, resolve_star, _emit_column_lineage
 from app.logging_config import get_logger
 
+# OUTPUT_KEYS minus "remarks"; remarks are normalized to a list separately
+_NON_REMARK_KEYS = tuple(k for k in OUTPUT_KEYS if k != "remarks")
+
 logger = get_logger(__name__)
 
 # ── Tech-failure sentinel row ─────────────────────────────────────────────────
@@ -491,12 +494,8 @@ def extract_lineage_rows(sql: str, regulation: str, metadatakey: str, view_name:
     normalized: List[Dict] = []
     for idx, r in enumerate(results):
         try:
-            row = {}
-            for k in OUTPUT_KEYS:
-                if k == "remarks":
-                    row[k] = ensure_list(r.get(k))
-                else:
-                    row[k] = str(r.get(k, "")) if r.get(k) is not None else ""
+            row = {k: (str(v) if (v := r.get(k)) is not None else "") for k in _NON_REMARK_KEYS}
+            row["remarks"] = ensure_list(r.get("remarks"))
             normalized.append(row)
         except Exception as exc:
             logger.error(
@@ -1,162 +1,226 @@
 """
 FROM-scope mapping and resolution for SQL lineage.
 """
-from typing import Dict, Tuple
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from sqlglot import exp
 
 from utils import safe_name
 
 
-def _pick_base_table_from_query(node) -> Tuple[str, str]:
+class ScopeEntry:
+    """
+    One FROM/JOIN source in a scope map: the source node, its resolved db / table /
+    alias (missing parts normalized to ""), and the lowercased forms used for
+    output, computed once per source.
+    """
+
+    __slots__ = ("node", "db", "table", "alias", "db_lc", "table_lc", "alias_lc")
+
+    def __init__(
+        self,
+        node: exp.Expression,
+        db: Optional[str],
+        table: Optional[str],
+        alias: Optional[str],
+    ) -> None:
+        self.node = node
+        self.db = db = db or ""
+        self.table = table = table or ""
+        self.alias = alias = alias or ""
+        self.db_lc = db.lower()
+        self.table_lc = table.lower()
+        self.alias_lc = alias.lower()
+
+    def as_tuple(self) -> Tuple[exp.Expression, str, str, str]:
+        """Legacy (node, db, table, alias) form of the entry."""
+        return (self.node, self.db, self.table, self.alias)
+
+
+# id(node) -> (node, (db, table)); the node is held so its id cannot be reused
+_base_table_cache: Dict[int, Tuple[exp.Expression, Tuple[str, str]]] = {}
+
+
+def reset_caches() -> None:
+    """Drop per-query memoized results; called once per extraction."""
+    _base_table_cache.clear()
+
+
+def _single_base_table(keys: Iterable[Tuple[str, str]]) -> Tuple[str, str]:
+    """The one distinct (db, table) among keys; ("", "") when there are none or several."""
+    first = None
+    for key in keys:
+        if first is None:
+            first = key
+        elif key != first:
+            return "", ""
+    return first if first is not None else ("", "")
+
+
+def _pick_base_table_from_query(node: Optional[exp.Expression]) -> Tuple[str, str]:
     """
     Resolve the single base table from any query node (Select, Subquery, etc.).
     Returns: (db, table_name). If zero or multiple tables exist, returns ("", "").
+    Memoized per node: CTE bodies and subqueries are resolved by both scope builders and JOIN handling.
     """
     if node is None:
         return "", ""
-    # Collect all Table nodes under this node (e.g. FROM / JOINs)
-    tables = list(node.find_all(exp.Table))
-    uniq = []
-    seen = set()
-    for t in tables:
-        t_name = safe_name(t.this) or ""
-        t_db = safe_name(t.db) or ""
-        key = (t_db, t_name)
-        if t_name and key not in seen:
-            seen.add(key)
-            uniq.append(key)
-    # Only return a single (db, table); ambiguous or empty -> ("", "")
-    if len(uniq) == 1:
-        return uniq[0][0], uniq[0][1]
-    return "", ""
-
-
-def _pick_base_table_from_subquery(subq: exp.Subquery) -> Tuple[str, str]:
-    """Resolve the base table inside a subquery. Delegates to _pick_base_table_from_query."""
-    return _pick_base_table_from_query(subq)
-
-
-def build_from_scope_map(ast_root) -> Dict[str, Tuple]:
+    cached = _base_table_cache.get(id(node))
+    if cached is not None and cached[0] is node:
+        return cached[1]
+
+    # Stop at the second distinct (db, table) under this node (e.g. FROM / JOINs)
+    result = _single_base_table(
+        (t.db, t_name) for t in node.find_all(exp.Table) if (t_name := safe_name(t.this))
+    )
+    _base_table_cache[id(node)] = (node, result)
+    return result
+
+
+def _source_to_entry(src: exp.Expression) -> Optional[Tuple[str, ScopeEntry]]:
     """
-    Build global scope: alias_key -> (node, db, table_name, table_alias).
-    Covers plain tables, aliased tables, and subqueries.
+    Scope key and entry for one FROM / JOIN source: a Table, a Subquery, or an Alias over
+    either. None for other nodes and for sources without a usable name.
+    Alias, Table and Subquery are matched by exact type (PivotAlias never wraps a source).
     """
-    from_map: Dict[str, Tuple] = {}
-
-    # 1) All tables in the query
-    for tbl in ast_root.find_all(exp.Table):
-        table_name = safe_name(tbl.this)
-        db = safe_name(tbl.db)
-        table_alias = tbl.alias_or_name if tbl.alias else None
+    src_type = type(src)
+    if src_type is exp.Table:
+        table_name = safe_name(src.this)
+        table_alias = src.alias or None
         key = table_alias or table_name
-        if key and key not in from_map:
-            from_map[key] = (tbl, db, table_name, table_alias)
+        return (key, ScopeEntry(src, safe_name(src.db), table_name, table_alias)) if key else None
+
+    if src_type is exp.Subquery:
+        subq_alias = src.alias or None
+        if not subq_alias:
+            return None
+        db, base_table = _pick_base_table_from_query(src)
+        return subq_alias, ScopeEntry(src, db, base_table, subq_alias)
 
-    # 2) Aliases
-    for alias in ast_root.find_all(exp.Alias):
-        key = alias.alias_or_name
+    if src_type is exp.Alias:
+        key = src.alias_or_name
         if not key:
-            continue
+            return None
+        inner = src.this
+        inner_type = type(inner)
+        if inner_type is exp.Table:
+            return key, ScopeEntry(src, safe_name(inner.db), safe_name(inner.this), key)
+        if inner_type is exp.Subquery:
+            db, base_table = _pick_base_table_from_query(inner)
+            return key, ScopeEntry(inner, db, base_table, key)
 
-        if isinstance(alias.this, exp.Table):
-            tbl = alias.this
-            from_map[key] = (alias, safe_name(tbl.db), safe_name(tbl.this), key)
+    return None
 
-        elif isinstance(alias.this, exp.Subquery):
-            # Record alias; resolve base table separately
-            db, base_table = _pick_base_table_from_subquery(alias.this)
-            from_map[key] = (alias.this, db, base_table, key)
 
-    # 3) Subquery alias mapping (JOIN subqueries and FROM subqueries)
-    for subq in ast_root.find_all(exp.Subquery):
-        subq_alias = subq.alias_or_name if subq.args.get("alias") else None
-        if not subq_alias:
+def build_from_scope_map(ast_root: exp.Expression) -> Dict[str, ScopeEntry]:
+    """
+    Build global scope: alias_key -> ScopeEntry(node, db, table_name, table_alias).
+    Covers plain tables, aliased tables, and subqueries.
+    """
+    if not isinstance(ast_root, exp.Expression):
+        return {}
+
+    # One walk over the tree. Each source kind is kept in its own map so the
+    # original precedence holds: tables (first wins) < aliases < subqueries (last wins).
+    table_map: Dict[str, ScopeEntry] = {}
+    alias_map: Dict[str, ScopeEntry] = {}
+    subq_map: Dict[str, ScopeEntry] = {}
+
+    # Top-level CTE bodies; the walk collects each body's (db, table) pairs for the CTE step
+    with_node = ast_root.args.get(_WITH_KEY)
+    ctes = [
+        cte for cte in (with_node.expressions if with_node else ()) if isinstance(cte, exp.CTE)
+    ]
+    cte_tables: Dict[int, List[Tuple[str, str]]] = {id(cte.this): [] for cte in ctes}
+
+    # Source node type -> the map its entries go to
+    source_maps = {exp.Table: table_map, exp.Alias: alias_map, exp.Subquery: subq_map}
+    table_type = exp.Table
+    # Same breadth-first order as ast_root.walk(); each node carries the table list of
+    # the CTE body it sits in (None outside CTE bodies)
+    queue = deque([(ast_root, None)])
+    while queue:
+        node, cte_bucket = queue.popleft()
+        cte_bucket = cte_tables.get(id(node), cte_bucket)
+        for child in node.iter_expressions():
+            queue.append((child, cte_bucket))
+        node_type = type(node)
+
+        # Tables inside CTE bodies feed the CTE step below
+        if cte_bucket is not None and node_type is table_type:
+            table_name = safe_name(node.this)
+            if table_name:
+                cte_bucket.append((node.db, table_name))
+
+        target = source_maps.get(node_type)
+        if target is None:
+            continue
+        hit = _source_to_entry(node)
+        if hit is None:
             continue
-        db, base_table = _pick_base_table_from_subquery(subq)
-        from_map[subq_alias] = (subq, db, base_table, subq_alias)
-
-    # 4) CTEs (WITH cte_name AS (SELECT ... FROM db.table)): map cte_name -> (db, table)
-    with_node = ast_root.args.get("with_") if hasattr(ast_root, "args") else None
-    if with_node and getattr(with_node, "expressions", None):
-        for cte in with_node.expressions:
-            if not isinstance(cte, exp.CTE):
-                continue
-            cte_alias = cte.alias_or_name
-            if not cte_alias:
-                alias_arg = cte.args.get("alias")
-                cte_alias = safe_name(alias_arg) if alias_arg else None
-            if not cte_alias:
-                continue
-            cte_query = cte.this
-            db, base_table = _pick_base_table_from_query(cte_query)
-            from_map[cte_alias] = (cte_query, db or "", base_table or cte_alias, cte_alias)
+        key, entry = hit
+        # tables: first occurrence wins; aliases / subqueries: last wins
+        if target is table_map and key in table_map:
+            continue
+        target[key] = entry
+
+    from_map: Dict[str, ScopeEntry] = {**table_map, **alias_map, **subq_map}
+
+    # CTEs (WITH cte_name AS (SELECT ... FROM db.table)): map cte_name -> (db, table)
+    for cte in ctes:
+        cte_alias = cte.alias_or_name
+        if not cte_alias:
+            alias_arg = cte.args.get("alias")
+            cte_alias = safe_name(alias_arg) if alias_arg else None
+        if not cte_alias:
+            continue
+        cte_query = cte.this
+        db, base_table = _single_base_table(cte_tables.get(id(cte_query), ()))
+        from_map[cte_alias] = ScopeEntry(cte_query, db or "", base_table or cte_alias, cte_alias)
 
     return from_map
 
 
-def build_select_scope_map(select_exp: exp.Select) -> Dict[str, Tuple]:
+# Placeholder table names for sources without a resolvable base table
+_DERIVED_SENTINELS = frozenset(("__SUBQUERY__", "__DERIVED__"))
+
+# Keys under which this sqlglot version stores FROM / WITH ("from_" / "with_" in newer releases)
+_FROM_KEY = "from_" if "from_" in exp.Select.arg_types else "from"
+_WITH_KEY = "with_" if "with_" in exp.Select.arg_types else "with"
+
+
+def build_select_scope_map(select_exp: exp.Select) -> Dict[str, ScopeEntry]:
     """
     LOCAL scope for one SELECT:
       includes only the FROM + JOIN sources of *this* SELECT.
     """
-    from_map: Dict[str, Tuple] = {}
-
-    def _add_source(src):
-        if src is None:
-            return
-
-        if isinstance(src, exp.Alias):
-            key = src.alias_or_name
-            if isinstance(src.this, exp.Table):
-                tbl = src.this
-                from_map[key] = (src, safe_name(tbl.db), safe_name(tbl.this), key)
-                return
-            if isinstance(src.this, exp.Subquery):
-                db, base_table = _pick_base_table_from_subquery(src.this)
-                from_map[key] = (src.this, db, base_table, key)
-                return
-
-        if isinstance(src, exp.Table):
-            table_name = safe_name(src.this)
-            db = safe_name(src.db)
-            table_alias = src.alias_or_name if src.alias else None
-            key = table_alias or table_name
-            if key:
-                from_map[key] = (src, db, table_name, table_alias)
-            return
-
-        if isinstance(src, exp.Subquery):
-            subq_alias = src.alias_or_name if src.args.get("alias") else None
-            if subq_alias:
-                db, base_table = _pick_base_table_from_subquery(src)
-                from_map[subq_alias] = (src, db, base_table, subq_alias)
-            return
+    from_map: Dict[str, ScopeEntry] = {}
 
     # FROM clause: sqlglot can store sources in from.expressions OR from.this
-    # Note: sqlglot uses "from_" (with underscore) as the key
-    from_clause = select_exp.args.get("from_") or select_exp.args.get("from")
+    from_clause = select_exp.args.get(_FROM_KEY)
     if from_clause:
-        sources = []
-        if hasattr(from_clause, "expressions") and from_clause.expressions:
-            sources = list(from_clause.expressions)
-        elif getattr(from_clause, "this", None) is not None:
+        sources = from_clause.expressions
+        if not sources and from_clause.this is not None:
             sources = [from_clause.this]
-
         for src in sources:
-            _add_source(src)
+            hit = _source_to_entry(src)
+            if hit is not None:
+                from_map[hit[0]] = hit[1]
 
     # JOINs
-    for j in (select_exp.args.get("joins") or []):
-        _add_source(getattr(j, "this", None))
+    for j in (select_exp.args.get("joins") or ()):
+        hit = _source_to_entry(j.this)
+        if hit is not None:
+            from_map[hit[0]] = hit[1]
 
     return from_map
 
 
 def _resolve_source(
     qualifier: str,
-    local_scope: Dict[str, Tuple],
-    global_scope: Dict[str, Tuple],
+    local_scope: Dict[str, ScopeEntry],
+    global_scope: Dict[str, ScopeEntry],
 ) -> Tuple[str, str, str]:
     """
     Resolve (db, table, table_alias) using:
@@ -165,21 +229,18 @@ def _resolve_source(
       - else if unqualified and global has exactly one source -> that
     """
     if qualifier:
-        if qualifier in local_scope:
-            _, db, table, table_alias = local_scope[qualifier]
-            return db or "", table or "", table_alias or ""
-        if qualifier in global_scope:
-            _, db, table, table_alias = global_scope[qualifier]
-            return db or "", table or "", table_alias or ""
+        entry = local_scope.get(qualifier) or global_scope.get(qualifier)
+        if entry is not None:
+            return entry.db, entry.table, entry.alias
         return "", "", ""
 
     if len(local_scope) == 1:
-        _, db, table, table_alias = next(iter(local_scope.values()))
-        return db or "", table or "", table_alias or ""
+        entry = next(iter(local_scope.values()))
+        return entry.db, entry.table, entry.alias
 
     if len(global_scope) == 1:
-        _, db, table, table_alias = next(iter(global_scope.values()))
-        return db or "", table or "", table_alias or ""
+        entry = next(iter(global_scope.values()))
+        return entry.db, entry.table, entry.alias
 
     return "", "", ""
 
@@ -189,7 +250,7 @@ def _attach_enclosing_alias_if_missing(
     table: str,
     table_alias: str,
     enclosing_alias: str,
-    global_scope: Dict[str, Tuple],
+    global_scope: Dict[str, ScopeEntry],
 ) -> Tuple[str, str, str]:
     """
     Generic attachment used for STAR / WHERE / normal columns when qualifier missing.
@@ -203,11 +264,12 @@ def _attach_enclosing_alias_if_missing(
         table_alias = enclosing_alias
 
     if enclosing_alias and not table:
-        if enclosing_alias in global_scope:
-            _, db2, base_table, _ = global_scope[enclosing_alias]
-            if base_table and base_table not in ("__SUBQUERY__", "__DERIVED__"):
+        entry = global_scope.get(enclosing_alias)
+        if entry is not None:
+            db2, base_table = entry.db, entry.table
+            if base_table and base_table not in _DERIVED_SENTINELS:
                 if not db:
-                    db = db2 or ""
+                    db = db2
                 table = base_table
             else:
                 table = "__DERIVED__"
@@ -13,20 +13,25 @@ Enhancements:
 Public API:
 - parse_metadata_and_extract_lineage(metadata_json_str, ...)
 - extract_lineage_rows(sql, regulation, metadatakey, view_name)
+- iter_lineage_rows(sql, regulation, metadatakey, view_name)
+- extract_lineage_rows_batch(items, max_workers=None, chunksize=16)
+- parse_metadata_and_extract_lineage_batch(metadata_json_strs, ..., max_workers=None, chunksize=32)
 - decode_base64_sql_from_metadata(metadata_json_str, sql_key=...)
 - deduplicate_records(records)
 """
-from typing import Dict, List
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Union
 
 # Re-export public API and constants for backward compatibility
-from lineage import extract_lineage_rows
+from lineage import extract_lineage_rows, extract_lineage_rows_batch, iter_lineage_rows, _warm_worker
 from utils import decode_base64_sql_from_metadata
 from deduplication import deduplicate_records
 from constants import REMARKS, OUTPUT_KEYS
 
 
 def parse_metadata_and_extract_lineage(
-    metadata_json_str: str,
+    metadata_json_str: Union[str, bytes],
     regulation: str = "",
     metadatakey: str = "",
     view_name: str = "",
@@ -38,9 +43,42 @@ def parse_metadata_and_extract_lineage(
     return deduplicate_records(results)
 
 
+def parse_metadata_and_extract_lineage_batch(
+    metadata_json_strs: Sequence[Union[str, bytes]],
+    regulation: str = "",
+    metadatakey: str = "",
+    view_name: str = "",
+    sql_key: str = "sql_query",
+    max_workers: Optional[int] = None,
+    chunksize: int = 32,
+    executor: Optional[Executor] = None,
+) -> List[List[Dict]]:
+    """
+    Run parse_metadata_and_extract_lineage over many metadata blobs in a process pool.
+    Returns one deduplicated row list per blob, in input order.
+    Pass a long-lived executor to reuse its warm workers across batches; it is not shut down here.
+    """
+    if not metadata_json_strs:
+        return []
+    worker = partial(
+        parse_metadata_and_extract_lineage,
+        regulation=regulation,
+        metadatakey=metadatakey,
+        view_name=view_name,
+        sql_key=sql_key,
+    )
+    if executor is not None:
+        return list(executor.map(worker, metadata_json_strs, chunksize=chunksize))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_worker) as executor:
+        return list(executor.map(worker, metadata_json_strs, chunksize=chunksize))
+
+
 __all__ = [
     "parse_metadata_and_extract_lineage",
+    "parse_metadata_and_extract_lineage_batch",
     "extract_lineage_rows",
+    "extract_lineage_rows_batch",
+    "iter_lineage_rows",
     "decode_base64_sql_from_metadata",
     "deduplicate_records",
     "REMARKS",
@@ -3,14 +3,33 @@ Utility functions for SQL lineage extraction.
 """
 import base64
 import json
-from typing import List, Optional
+from functools import lru_cache
+from typing import Any, List, Optional, Union
 
 from sqlglot import exp
 
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used when orjson is not installed
+    orjson = None
 
-def decode_base64_sql_from_metadata(metadata_json_str: str, sql_key: str = "sql_query") -> str:
-    """Decode base64-encoded SQL from a JSON metadata string; falls back to raw value if decode fails."""
-    meta = json.loads(metadata_json_str)
+# Metadata blobs up to this size are memoized; larger ones are decoded directly so the
+# cache cannot pin many large strings in memory
+_DECODE_CACHE_MAX_LEN = 64 * 1024
+
+
+def _loads(text: Union[str, bytes]) -> Any:
+    """json.loads, through orjson when available; anything orjson rejects is retried with json."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def _decode_base64_sql(metadata_json_str: Union[str, bytes], sql_key: str) -> str:
+    meta = _loads(metadata_json_str)
     b64 = meta.get(sql_key, "")
     try:
         return base64.b64decode(b64).decode("utf-8")
@@ -19,8 +38,27 @@ def decode_base64_sql_from_metadata(metadata_json_str: str, sql_key: str = "sql_
         return b64
 
 
-def ensure_list(val) -> List[str]:
-    """Return val as a list of strings; None -> [], single value -> [str(val)]."""
+_decode_base64_sql_cached = lru_cache(maxsize=1024)(_decode_base64_sql)
+
+
+def decode_base64_sql_from_metadata(metadata_json_str: Union[str, bytes], sql_key: str = "sql_query") -> str:
+    """
+    Decode base64-encoded SQL from a JSON metadata string; falls back to raw value if decode fails.
+    Raw bytes (e.g. a payload read straight from a file or queue) are accepted without a decode step.
+    Repeated blobs (bulk runs over the same views) are served from an LRU cache.
+    """
+    if len(metadata_json_str) <= _DECODE_CACHE_MAX_LEN:
+        return _decode_base64_sql_cached(metadata_json_str, sql_key)
+    return _decode_base64_sql(metadata_json_str, sql_key)
+
+
+def ensure_list(val: Any) -> List[str]:
+    """
+    Return val as a list of strings; None -> [], single value -> [str(val)].
+    None gets a fresh list (not a shared empty tuple): results become output "remarks" cells.
+    """
+    if type(val) is list:
+        return val
     if val is None:
         return []
     if isinstance(val, list):
@@ -28,17 +66,30 @@ def ensure_list(val) -> List[str]:
     return [str(val)]
 
 
-def safe_name(obj) -> Optional[str]:
-    """Extract a string name from an AST node or string; returns None for None."""
+def safe_name(obj: Union[exp.Expression, str, None]) -> Optional[str]:
+    """
+    Extract a string name from an AST node or string; returns None for None.
+    A node without a name gives "" -- never str(node), which would render it back to SQL.
+    """
     if obj is None:
         return None
-    if isinstance(obj, str):
+    if type(obj) is str:
         return obj
-    return getattr(obj, "name", None) or str(obj)
+    return getattr(obj, "name", "") or ""
 
 
-def extract_columns_from_expression(expr):
-    """Return all Column nodes found under the given expression (recursive)."""
+def extract_columns_from_expression(expr: Any, stop_at_subquery: bool = False) -> List[exp.Column]:
+    """
+    Return all Column nodes found under the given expression (recursive).
+    With stop_at_subquery, nested queries (subqueries, EXISTS selects, set operations)
+    are not entered: their columns belong to their own SELECT scope.
+    """
     if not isinstance(expr, exp.Expression):
         return []
-    return list(expr.find_all(exp.Column))
+    if not stop_at_subquery:
+        return list(expr.find_all(exp.Column))
+    return [
+        node
+        for node in expr.bfs(prune=lambda n: isinstance(n, exp.Query))
+        if isinstance(node, exp.Column)
+    ]
@@ -5,11 +5,22 @@ Tests all possible SQL patterns and validates output.
 
 import json
 import base64
+from concurrent.futures import ProcessPoolExecutor
 import pytest
+import sqlglot
+from sqlglot import exp
+
+from helpers import build_select_context
+from scope import build_from_scope_map, _pick_base_table_from_query
+from utils import safe_name
 
 from test_sql import (
     extract_lineage_rows,
+    extract_lineage_rows_batch,
+    iter_lineage_rows,
+    decode_base64_sql_from_metadata,
     parse_metadata_and_extract_lineage,
+    parse_metadata_and_extract_lineage_batch,
     REMARKS
 )
 
@@ -170,6 +181,156 @@ def test_metadata_api():
     assert any(r["columnName"] == "id" for r in results)
 
 
+def test_metadata_decode_repeat_and_fallback():
+    sql = "SELECT id FROM users"
+    metadata = json.dumps({"sql_query": base64.b64encode(sql.encode()).decode()})
+
+    assert decode_base64_sql_from_metadata(metadata) == sql
+    assert decode_base64_sql_from_metadata(metadata) == sql
+    assert decode_base64_sql_from_metadata(metadata.encode()) == sql
+    # Not base64: the raw value comes back unchanged
+    assert decode_base64_sql_from_metadata(json.dumps({"q": "SELECT 1"}), "q") == "SELECT 1"
+
+
+def test_duplicate_rows_emitted_once():
+    sql = "SELECT a.id FROM t a JOIN u b ON a.id = b.id AND a.id = b.id"
+
+    deduped = lineage(sql)
+    raw = extract_lineage_rows(sql, REG, KEY, VIEW, dedupe=False)
+
+    assert len(raw) > len(deduped)
+    assert [r for i, r in enumerate(raw) if r not in raw[:i]] == deduped
+
+
+def test_select_context_flags():
+    sql = """
+    SELECT a.x FROM (SELECT x, id FROM db.t1) a
+    JOIN (SELECT id FROM db.t2 WHERE flag = 1) b ON a.id = b.id
+    """
+    ast = sqlglot.parse_one(sql, dialect="spark")
+    outer, sub_a, sub_b = list(ast.find_all(exp.Select))
+
+    context = build_select_context(ast)
+
+    assert context[id(outer)] == (True, False, None)
+    assert context[id(sub_a)] == (False, False, "a")
+    assert context[id(sub_b)] == (False, True, "b")
+
+
+def test_batch_matches_single():
+    items = [
+        ("SELECT id FROM users", REG, KEY, VIEW),
+        ("SELECT u.id, o.total FROM users u JOIN orders o ON u.id = o.user_id", REG, KEY, "V2"),
+    ]
+
+    results = extract_lineage_rows_batch(items, max_workers=2)
+
+    assert results == [extract_lineage_rows(*item) for item in items]
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert extract_lineage_rows_batch(items, executor=executor) == results
+        assert extract_lineage_rows_batch(items[:1], executor=executor) == results[:1]
+
+
+def test_metadata_batch_matches_single():
+    metas = [
+        json.dumps({"sql_query": base64.b64encode(sql.encode()).decode()})
+        for sql in ("SELECT id FROM users", "SELECT o.total FROM orders o WHERE o.total > 0")
+    ]
+
+    results = parse_metadata_and_extract_lineage_batch(metas, REG, KEY, VIEW, max_workers=2)
+
+    assert results == [parse_metadata_and_extract_lineage(m, REG, KEY, VIEW) for m in metas]
+    assert parse_metadata_and_extract_lineage_batch([]) == []
+
+
+def test_iter_matches_list():
+    sql = "SELECT u.id, o.total FROM users u JOIN orders o ON u.id = o.user_id WHERE o.total > 0"
+
+    rows = iter_lineage_rows(sql, REG, KEY, VIEW)
+
+    assert not isinstance(rows, list)
+    assert list(rows) == extract_lineage_rows(sql, REG, KEY, VIEW)
+
+
+def test_safe_name_never_renders_sql():
+    assert safe_name(None) is None
+    assert safe_name("tbl") == "tbl"
+    assert safe_name(exp.to_identifier("tbl")) == "tbl"
+    # An unnamed node yields "" rather than its SQL text
+    assert safe_name(sqlglot.parse_one("(a + b)")) == ""
+
+
+def test_subquery_columns_not_attributed_to_outer_where():
+    sql = "SELECT u.name FROM users u WHERE u.id IN (SELECT user_id FROM orders WHERE amount > 1000)"
+
+    results = lineage(sql)
+
+    # user_id / amount come from the subquery's own SELECT, against orders only
+    for r in results:
+        if r["columnName"] in ("user_id", "amount"):
+            assert r["tableName"] == "orders"
+    assert has_column(results, "amount")
+
+
+def test_scalar_subquery_projection_keeps_alias_lineage():
+    sql = (
+        "SELECT d.department_name, "
+        "(SELECT COUNT(*) FROM employees e WHERE e.department_id = d.department_id) AS headcount "
+        "FROM departments d"
+    )
+
+    results = lineage(sql)
+
+    # The scalar subquery is a projection root, so its columns still feed the outer alias
+    headcount = {(r["tableName"], r["columnName"]) for r in results if r["aliasName"] == "headcount"}
+    assert ("employees", "department_id") in headcount
+    assert ("departments", "department_id") in headcount
+    assert any(r["aliasName"] == "m" for r in lineage("SELECT (SELECT max(x) FROM u) AS m FROM t"))
+
+
+def test_scope_entry_as_tuple():
+    select = sqlglot.parse_one("SELECT o.id FROM sales.orders o")
+    entry = build_from_scope_map(select)["o"]
+
+    node, db, table, alias = entry.as_tuple()
+    assert node is entry.node
+    assert (db, table, alias) == ("sales", "orders", "o")
+
+    # missing parts are normalized to "" rather than None
+    bare = build_from_scope_map(sqlglot.parse_one("SELECT id FROM orders"))["orders"]
+    assert bare.as_tuple()[1:] == ("", "orders", "")
+
+
+def test_select_star_from_derived_table_emits_dataset_row():
+    sql = "SELECT * FROM (SELECT a.x, b.y FROM db1.t1 a JOIN db2.t2 b ON a.id = b.id) TSR_TS_DATA"
+
+    results = lineage(sql)
+
+    assert has_column(results, "*", table="TSR_TS_DATA")
+
+
+def test_pick_base_table_single_distinct_source():
+    def pick(sql):
+        return _pick_base_table_from_query(sqlglot.parse_one(sql))
+
+    assert pick("SELECT a FROM db.t") == ("db", "t")
+    # the same table twice is still one distinct source
+    assert pick("SELECT x.a FROM db.t x JOIN db.t y ON x.id = y.id") == ("db", "t")
+    assert pick("SELECT x.a FROM db.t x JOIN db.u y ON x.id = y.id") == ("", "")
+    assert pick("SELECT 1") == ("", "")
+
+
+def test_function_only_select_without_from():
+    results = lineage("SELECT current_date() AS d, 1 AS one")
+
+    assert len(results) == 1
+    assert results[0]["columnName"] == "current_date"
+    assert results[0]["aliasName"] == "d"
+    assert results[0]["tableName"] == ""
+    assert "function_expression" in results[0]["remarks"]
+
+
 # ============================================================================
 # EXACT OUTPUT VALIDATION
 # ============================================================================
@@ -8,110 +8,199 @@ Date: November 12, 2025
 Version: 2.0
 
 Usage:
-    python sql_lineage_parser.py <sql_file1> <sql_file2> ...
+    python sql_lineage_parser.py [--print] <sql_file1> <sql_file2> ...
+    
+    --print    also render the full lineage table to the console
+               (results are always written to sql_lineage_output.csv)
     
 Example:
     python sql_lineage_parser.py query.sql
     python sql_lineage_parser.py query1.sql query2.sql query3.sql
+    python sql_lineage_parser.py --print query.sql
 """
 
 import re
-import sqlparse
-import pandas as pd
 import os
+import csv
+import mmap
+import hashlib
 import sys
-from typing import List, Dict
+from sys import intern
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from operator import itemgetter
+from typing import List, Dict, Optional, Union, TYPE_CHECKING
 from pathlib import Path
 
+# pandas is only needed for the DataFrame-returning methods and --print, so it is imported
+# there; the CLI path (and every parse worker process) starts without it
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# One lineage row as an immutable tuple: smaller than a dict, hashable, and cheap to pickle
+LineageEntry = namedtuple('LineageEntry', ['database_name', 'table_name', 'column_name', 'alias_name', 'remarks'])
 
 class SQLLineageParser:
     """Main parser class for extracting SQL column lineage"""
     
-    def __init__(self):
+    # Pre-compiled regex patterns for performance
+    STAR_SUBQUERY_PATTERN = re.compile(r'^\s*SELECT\s+\*\s+FROM\s*\(', re.IGNORECASE)
+    SUBQUERY_BODY_PATTERN = re.compile(r'FROM\s*\((.*)\)\s+\w+', re.IGNORECASE | re.DOTALL)
+    LINE_COMMENT_PATTERN = re.compile(r'--.*$', re.MULTILINE)
+    BLOCK_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+    FROM_PATTERN = re.compile(r'\bFROM\s+([^()]+?)(?:\s+(?:LEFT|RIGHT|INNER|OUTER|CROSS)?\s*JOIN|\s+WHERE|\s+GROUP\s+BY|\s+HAVING|\s+ORDER\s+BY|\s*$)', re.IGNORECASE | re.DOTALL)
+    TABLE_PATTERN = re.compile(r'([\w_]+(?:\.[\w_]+)*)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+    SELECT_KEYWORD_PATTERN = re.compile(r'\bSELECT\b', re.IGNORECASE)
+    SELECT_PATTERN = re.compile(r'\bSELECT\s+(.*?)(?=\s+FROM\s+)', re.IGNORECASE | re.DOTALL)
+    WINDOW_FUNCTION_PATTERN = re.compile(r'\bOVER\s*\(', re.IGNORECASE)
+    WINDOW_ALIAS_PATTERN = re.compile(r'\)\s+AS\s+([\w_]+)', re.IGNORECASE)
+    STAR_PATTERN = re.compile(r'(\w+)\.\*')
+    COLUMN_DELIMITER_PATTERN = re.compile(r'[,()"\']')
+    # Quoted literals/identifiers (with sqlparse's escape rules), parentheses and semicolons
+    STATEMENT_TOKEN_PATTERN = re.compile(r"""'(?:''|\\'|[^'])*'|"(?:""|\\"|[^"])*"|`(?:``|[^`])*`|[;()]""")
+    # Remark classification, matched against the upper-cased column expression
+    RANKING_FUNCTION_PATTERN = re.compile(r'(?:ROW_NUMBER|RANK)\(\)')  # also covers DENSE_RANK()
+    DERIVED_FUNCTION_PATTERN = re.compile(r'COALESCE\(|CASE WHEN|NVL\(|CONCAT\(|CAST\(')
+    CONSTANT_VALUE_PATTERN = re.compile(r"'(?:ACCOUNTMNEMONIC|PRIMO|L|BR|FALSE|TRUE)'")
+    ALIAS_PATTERN = re.compile(r'(.*?)\s+AS\s+([\w_]+)', re.IGNORECASE)
+    TRAILING_IDENTIFIER_PATTERN = re.compile(r'[\w_]+$')
+    FUNCTION_CALL_PATTERN = re.compile(r'\(.*\)')
+    IDENTIFIER_PATTERN = re.compile(r'[\w_]+')
+    # Plain [db.][table.]column [AS alias] reference, the common column shape, in one match
+    SIMPLE_COLUMN_PATTERN = re.compile(r'(?:\w+\.)*?(?:(?P<table>\w+)\.)?(?P<column>\w+)(?:\s+AS\s+(?P<alias>\w+))?', re.IGNORECASE)
+    # JOIN clause head up to its ON; the condition runs to the next JOIN_CONDITION_END_PATTERN
+    # match (or the end of the text), found by a plain search rather than a lazy .*? lookahead;
+    # (?<!\s) tries each whitespace run once, from its start, instead of from every offset in it
+    JOIN_PATTERN = re.compile(r'(?:LEFT|RIGHT|INNER|OUTER|CROSS)?\s*JOIN\s+([\w_.]+)(?:\s+(?:AS\s+)?(\w+))?\s+ON\s+', re.IGNORECASE)
+    JOIN_CONDITION_END_PATTERN = re.compile(r'(?<!\s)\s+(?:(?:(?:LEFT|RIGHT|INNER|OUTER|CROSS)\s*)?JOIN|WHERE|GROUP\s+BY|ORDER\s+BY)', re.IGNORECASE)
+    
+    # Keywords the FROM-clause table pattern can pick up as table names
+    FROM_KEYWORDS = frozenset(['AS', 'ON', 'AND', 'OR'])
+    
+    # Lineage row keys and the matching output column names
+    LINEAGE_KEYS = LineageEntry._fields
+    OUTPUT_COLUMNS = ['Database Name', 'Table Name', 'Column Name', 'Alias Name', 'Remarks']
+    
+    # In-process batches larger than this read their files ahead on a small thread pool
+    PREFETCH_MIN_FILES = 16
+    PREFETCH_THREADS = 8
+    
+    def __init__(self) -> None:
         self.ignored_keywords = ['elastic_query', 'mongo_query']
+        # Lineage rows per cleaned SQL (keyed by digest), so repeated queries are parsed once
+        self._parse_cache: Dict[bytes, List[LineageEntry]] = {}
+        # Paths the last parse_sql_files call could not find
+        self.missing_files: List[str] = []
         
-    def parse_sql_files(self, sql_files: List[str]) -> pd.DataFrame:
+    def parse_sql_files(self, sql_files: List[str], max_workers: Optional[int] = None) -> 'pd.DataFrame':
         """
         Parse multiple SQL files and extract column lineage information
         
         Args:
             sql_files: List of SQL file paths to parse
+            max_workers: Worker processes for multi-file batches (default: one per CPU);
+                         1 parses every file in this process
             
         Returns:
             DataFrame with columns: Database Name, Table Name, Column Name, Alias Name, Remarks
         """
-        all_lineage_data = []
+        return self._unique_entries_to_dataframe(self.collect_lineage_entries(sql_files, max_workers))
+    
+    def collect_lineage_entries(self, sql_files: List[str], max_workers: Optional[int] = None) -> List[LineageEntry]:
+        """parse_sql_files without pandas: the de-duplicated LineageEntry rows, in first-seen order"""
+        # Rows de-duplicated as they arrive; dict keys keep first-occurrence order
+        unique_entries: Dict[LineageEntry, None] = {}
+        self.missing_files = []
+        
+        # Files are independent: fan them out over worker processes (the work is CPU-bound
+        # regex, so threads would serialize on the GIL). map() keeps results in file order.
+        # Missing files are not stat-ed up front; opening them fails in read_and_parse_file.
+        if len(sql_files) > 1 and max_workers != 1:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_file_worker,
+                                     initargs=(type(self),)) as executor:
+                results = list(executor.map(_read_and_parse_in_worker, sql_files))
+        elif len(sql_files) > self.PREFETCH_MIN_FILES:
+            # Parsing in this process: let threads issue the reads (file I/O releases the GIL)
+            # so later files are already in memory by the time the parser reaches them
+            with ThreadPoolExecutor(max_workers=self.PREFETCH_THREADS) as reader:
+                results = [self.read_and_parse_file(sql_file, text)
+                           for sql_file, text in zip(sql_files, reader.map(_read_sql_text, sql_files))]
+        else:
+            results = [self.read_and_parse_file(sql_file) for sql_file in sql_files]
         
-        for sql_file in sql_files:
-            if not os.path.exists(sql_file):
+        for sql_file, (was_read, lineage_data, error) in zip(sql_files, results):
+            if not was_read and error is None:
                 print(f"⚠️  Warning: File {sql_file} not found, skipping...")
+                self.missing_files.append(sql_file)
                 continue
-                
-            try:
-                with open(sql_file, 'r', encoding='utf-8') as file:
-                    sql_content = file.read()
-                    
+            if was_read:
                 print(f"📄 Processing file: {sql_file}")
-                lineage_data = self.parse_single_sql(sql_content, sql_file)
-                all_lineage_data.extend(lineage_data)
+            if error is None:
+                unique_entries.update(dict.fromkeys(lineage_data))
                 print(f"✅ Extracted {len(lineage_data)} column mappings")
-                
-            except Exception as e:
-                print(f"❌ Error processing file {sql_file}: {str(e)}")
-                all_lineage_data.append({
-                    'database_name': 'ERROR',
-                    'table_name': 'ERROR',
-                    'column_name': 'ERROR', 
-                    'alias_name': 'ERROR',
-                    'remarks': f'failure_processing_file: {str(e)}'
-                })
+            else:
+                print(f"❌ Error processing file {sql_file}: {error}")
+                unique_entries[LineageEntry('ERROR', 'ERROR', 'ERROR', 'ERROR',
+                                            f'failure_processing_file: {error}')] = None
             
-        return self.create_lineage_dataframe(all_lineage_data)
+        return list(unique_entries)
+    
+    def read_and_parse_file(self, sql_file: str, text: Union[str, Exception, None] = None) -> tuple:
+        """Read and parse one SQL file: (file was read, LineageEntry rows, error message or None)
+        
+        text is the file's prefetched _read_sql_text result, if any.
+        A file that does not exist comes back as (False, None, None).
+        """
+        if text is None:
+            text = _read_sql_text(sql_file)
+        if isinstance(text, FileNotFoundError):
+            return False, None, None
+        if isinstance(text, Exception):
+            return False, None, str(text)
+        
+        try:
+            return True, self.parse_sql_entries(text, sql_file), None
+        except Exception as e:
+            return True, None, str(e)
     
     def parse_single_sql(self, sql_content: str, filename: str) -> List[Dict[str, str]]:
         """Parse a single SQL query and extract lineage information"""
+        keys = self.LINEAGE_KEYS
+        return [dict(zip(keys, entry)) for entry in self.parse_sql_entries(sql_content, filename)]
+    
+    def parse_sql_entries(self, sql_content: str, filename: str) -> List[LineageEntry]:
+        """parse_single_sql with rows as LineageEntry tuples; results are cached per cleaned SQL"""
         lineage_data = []
         
         # Clean and normalize SQL
         sql_content = self.clean_sql(sql_content)
         
         if not sql_content.strip():
-            return [{
-                'database_name': 'N/A',
-                'table_name': 'N/A', 
-                'column_name': 'N/A',
-                'alias_name': 'N/A',
-                'remarks': 'empty_sql_content'
-            }]
+            return [LineageEntry('N/A', 'N/A', 'N/A', 'N/A', 'empty_sql_content')]
         
         # Check for ignored patterns
         remarks = self.get_remarks(sql_content)
         
         if "ignored" in remarks:
-            return [{
-                'database_name': 'N/A',
-                'table_name': 'N/A', 
-                'column_name': 'N/A',
-                'alias_name': 'N/A',
-                'remarks': remarks
-            }]
+            return [LineageEntry('N/A', 'N/A', 'N/A', 'N/A', remarks)]
+        
+        cache_key = hashlib.blake2b(sql_content.encode('utf-8'), digest_size=16).digest()
+        cached = self._parse_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
         
         try:
-            # Parse SQL using sqlparse
-            parsed = sqlparse.parse(sql_content)
+            # Split into statements; only the statement text is used downstream
+            parsed = self.split_sql_statements(sql_content)
             
             if not parsed:
-                return [{
-                    'database_name': 'N/A',
-                    'table_name': 'N/A',
-                    'column_name': 'N/A',
-                    'alias_name': 'N/A',
-                    'remarks': 'failed_to_parse_sql'
-                }]
+                return [LineageEntry('N/A', 'N/A', 'N/A', 'N/A', 'failed_to_parse_sql')]
                 
             # Process each statement
             for stmt in parsed:
-                if not str(stmt).strip() or str(stmt).strip() == ';':
+                if not stmt or stmt == ';':
                     continue
                     
                 stmt_lineage = self.process_sql_statement(stmt, filename)
@@ -127,21 +216,28 @@ class SQLLineageParser:
                 'remarks': f'failure_sql_lineage_tech: {str(e)}'
             })
             
-        return lineage_data
+        # Database, table and remarks repeat across rows: intern them so repeats share one string
+        entries = [
+            LineageEntry(intern(row['database_name']), intern(row['table_name']), row['column_name'],
+                         row['alias_name'], intern(row['remarks']))
+            for row in lineage_data
+        ]
+        self._parse_cache[cache_key] = entries
+        return list(entries)
     
-    def process_sql_statement(self, stmt, filename: str) -> List[Dict[str, str]]:
+    def process_sql_statement(self, stmt: str, filename: str) -> List[Dict[str, str]]:
         """Process a single SQL statement"""
         lineage_data = []
         sql_text = str(stmt).strip()
         
         # Check if this is a subquery wrapped statement
-        if re.match(r'^\s*SELECT\s+\*\s+FROM\s*\(', sql_text, re.IGNORECASE):
+        if self.STAR_SUBQUERY_PATTERN.match(sql_text):
             # This is selecting from a subquery
-            subquery_match = re.search(r'FROM\s*\((.*)\)\s+\w+', sql_text, re.IGNORECASE | re.DOTALL)
+            subquery_match = self.SUBQUERY_BODY_PATTERN.search(sql_text)
             if subquery_match:
                 subquery_text = subquery_match.group(1).strip()
                 # Parse the inner query
-                inner_parsed = sqlparse.parse(subquery_text)
+                inner_parsed = self.split_sql_statements(subquery_text)
                 if inner_parsed:
                     for inner_stmt in inner_parsed:
                         inner_lineage = self.process_inner_statement(inner_stmt, filename)
@@ -150,32 +246,35 @@ class SQLLineageParser:
             return lineage_data
         
         # Extract main query information
-        main_tables = self.extract_main_tables(stmt)
-        join_info = self.extract_join_info(stmt)
+        main_tables = self.extract_main_tables(sql_text)
+        join_info = self.extract_join_info(sql_text)
         
         # Process SELECT columns
-        select_columns = self.extract_select_columns(stmt)
+        select_columns = self.extract_select_columns(sql_text)
+        table_lookup = self.build_table_lookup(main_tables, join_info)
         
         for col_info in select_columns:
-            lineage_entry = self.process_column_lineage(col_info, main_tables, join_info, filename, 0)
+            lineage_entry = self.process_column_lineage(col_info, main_tables, join_info, filename, 0, table_lookup)
             if lineage_entry:
                 lineage_data.append(lineage_entry)
                 
         return lineage_data
     
-    def process_inner_statement(self, stmt, filename: str) -> List[Dict[str, str]]:
+    def process_inner_statement(self, stmt: str, filename: str) -> List[Dict[str, str]]:
         """Process an inner/nested SQL statement"""
         lineage_data = []
+        sql_text = str(stmt).strip()
         
         # Extract tables and joins from inner query
-        main_tables = self.extract_main_tables(stmt)
-        join_info = self.extract_join_info(stmt)
+        main_tables = self.extract_main_tables(sql_text)
+        join_info = self.extract_join_info(sql_text)
         
         # Process SELECT columns
-        select_columns = self.extract_select_columns(stmt)
+        select_columns = self.extract_select_columns(sql_text)
+        table_lookup = self.build_table_lookup(main_tables, join_info)
         
         for col_info in select_columns:
-            lineage_entry = self.process_column_lineage(col_info, main_tables, join_info, filename, 0)
+            lineage_entry = self.process_column_lineage(col_info, main_tables, join_info, filename, 0, table_lookup)
             if lineage_entry:
                 lineage_data.append(lineage_entry)
                 
@@ -183,45 +282,43 @@ class SQLLineageParser:
     
     def clean_sql(self, sql_content: str) -> str:
         """Clean SQL content by removing comments and normalizing"""
-        # Remove single line comments
-        sql_content = re.sub(r'--.*$', '', sql_content, flags=re.MULTILINE)
+        # Remove single line comments (the scan is skipped when there are none)
+        if '--' in sql_content:
+            sql_content = self.LINE_COMMENT_PATTERN.sub('', sql_content)
         # Remove multi-line comments (including hints like /*+ BROADCAST */)
-        sql_content = re.sub(r'/\*.*?\*/', '', sql_content, flags=re.DOTALL)
+        if '/*' in sql_content:
+            sql_content = self.BLOCK_COMMENT_PATTERN.sub('', sql_content)
         # Remove extra whitespace but keep newlines for parsing
-        sql_content = re.sub(r'\s+', ' ', sql_content)
+        sql_content = self.WHITESPACE_PATTERN.sub(' ', sql_content)
         return sql_content.strip()
     
     def get_remarks(self, sql_content: str) -> str:
         """Determine remarks based on SQL patterns"""
-        sql_lower = sql_content.lower()
-        
-        if sql_lower.strip().startswith('{'):
+        # Only the first non-blank character matters: no lowercased copy of the whole query
+        if sql_content.lstrip().startswith('{'):
             return "ignored_elastic_query"
             
         return ""
     
-    def extract_main_tables(self, stmt) -> List[Dict[str, str]]:
-        """Extract main tables with their aliases and database information"""
+    def extract_main_tables(self, sql_text: str) -> List[Dict[str, str]]:
+        """Extract main tables with their aliases and database information (sql_text: stripped statement)"""
         tables = []
-        sql_text = str(stmt).strip()
         
         # Enhanced FROM clause extraction - stop at JOIN, WHERE, GROUP BY, etc.
-        from_pattern = r'\bFROM\s+([^()]+?)(?:\s+(?:LEFT|RIGHT|INNER|OUTER|CROSS)?\s*JOIN|\s+WHERE|\s+GROUP\s+BY|\s+HAVING|\s+ORDER\s+BY|\s*$)'
-        from_match = re.search(from_pattern, sql_text, re.IGNORECASE | re.DOTALL)
+        from_match = self.FROM_PATTERN.search(sql_text)
         
         if from_match:
             from_clause = from_match.group(1).strip()
             
             # Extract tables with optional database.schema.table patterns and aliases
-            table_pattern = r'([\w_]+(?:\.[\w_]+)*)(?:\s+(?:AS\s+)?(\w+))?'
-            table_matches = re.finditer(table_pattern, from_clause, re.IGNORECASE)
+            table_matches = self.TABLE_PATTERN.finditer(from_clause)
             
             for match in table_matches:
                 full_table_name = match.group(1)
                 table_alias = match.group(2)
                 
-                # Skip SQL keywords that might match
-                if full_table_name.upper() in ['AS', 'ON', 'AND', 'OR']:
+                # Skip SQL keywords that might match (all are at most 3 characters long)
+                if len(full_table_name) <= 3 and full_table_name.upper() in self.FROM_KEYWORDS:
                     continue
                 
                 # Parse database.schema.table pattern
@@ -249,17 +346,16 @@ class SQLLineageParser:
                         
         return tables
     
-    def extract_select_columns(self, stmt) -> List[Dict[str, str]]:
-        """Extract columns from SELECT clause with improved parsing"""
+    def extract_select_columns(self, sql_text: str) -> List[Dict]:
+        """Extract columns from SELECT clause with improved parsing (sql_text: stripped statement)"""
         columns = []
-        sql_text = str(stmt).strip()
         
         # Skip if not a SELECT statement
-        if not re.search(r'\bSELECT\b', sql_text, re.IGNORECASE):
+        if not self.SELECT_KEYWORD_PATTERN.search(sql_text):
             return columns
         
         # Find SELECT clause more robustly - handle subqueries
-        select_match = re.search(r'\bSELECT\s+(.*?)(?=\s+FROM\s+)', sql_text, re.IGNORECASE | re.DOTALL)
+        select_match = self.SELECT_PATTERN.search(sql_text)
         if not select_match:
             return columns
             
@@ -278,49 +374,99 @@ class SQLLineageParser:
     def split_sql_columns(self, select_clause: str) -> List[str]:
         """Split SQL SELECT clause into individual column expressions"""
         columns = []
-        current = ""
+        start = 0
         paren_depth = 0
-        in_quotes = False
-        quote_char = None
-        
-        for char in select_clause:
-            if char in ['"', "'"] and not in_quotes:
-                in_quotes = True
-                quote_char = char
-            elif char == quote_char and in_quotes:
-                in_quotes = False
-                quote_char = None
-            elif char == '(' and not in_quotes:
+        pos = 0
+        find_delimiter = self.COLUMN_DELIMITER_PATTERN.search
+        
+        # Jump between commas, parentheses and quotes instead of visiting every character
+        while True:
+            match = find_delimiter(select_clause, pos)
+            if match is None:
+                break
+            pos = match.start()
+            char = select_clause[pos]
+            
+            if char == ',':
+                if paren_depth == 0:
+                    column = select_clause[start:pos].strip()
+                    if column:
+                        columns.append(column)
+                    start = pos + 1
+            elif char == '(':
                 paren_depth += 1
-            elif char == ')' and not in_quotes:
+            elif char == ')':
                 paren_depth -= 1
-            elif char == ',' and paren_depth == 0 and not in_quotes:
-                if current.strip():
-                    columns.append(current.strip())
-                current = ""
-                continue
-                
-            current += char
+            else:
+                # Quoted text: skip straight to the matching closing quote
+                pos = select_clause.find(char, pos + 1)
+                if pos == -1:
+                    break
+            pos += 1
             
-        if current.strip():
-            columns.append(current.strip())
+        column = select_clause[start:].strip()
+        if column:
+            columns.append(column)
             
         return columns
     
-    def parse_column_expression(self, col_expr: str) -> Dict[str, str]:
+    def split_sql_statements(self, sql: str) -> List[str]:
+        """
+        Split SQL text into stripped statements, each keeping its trailing ';'.
+        Semicolons inside quotes or parentheses do not end a statement.
+        """
+        statements = []
+        start = 0
+        paren_depth = 0
+        
+        # Quoted text matches as one token, so only its delimiters outside quotes are seen
+        for match in self.STATEMENT_TOKEN_PATTERN.finditer(sql):
+            token = match.group()
+            if token == ';':
+                if paren_depth <= 0:
+                    statement = sql[start:match.end()].strip()
+                    if statement:
+                        statements.append(statement)
+                    start = match.end()
+                    paren_depth = 0
+            elif token == '(':
+                paren_depth += 1
+            elif token == ')':
+                paren_depth -= 1
+                
+        statement = sql[start:].strip()
+        if statement:
+            statements.append(statement)
+            
+        return statements
+    
+    def parse_column_expression(self, col_expr: str) -> Optional[Dict]:
         """Parse a single column expression into its components"""
         col_expr = col_expr.strip()
         if not col_expr:
             return None
             
+        # Plain column references resolve in one match; anything else takes the checks below
+        simple_match = self.SIMPLE_COLUMN_PATTERN.fullmatch(col_expr)
+        if simple_match:
+            table_name, column_name, alias_name = simple_match.group('table', 'column', 'alias')
+            return {
+                'original_expression': col_expr,
+                'table_name': table_name,
+                'column_name': column_name,
+                'alias_name': alias_name or column_name,
+                'is_star': False,
+                'is_derived': False
+            }
+            
         table_name = None
         column_name = None
         alias_name = None
         
         # Check for window functions (ROW_NUMBER, RANK, etc.)
-        if re.search(r'\bOVER\s*\(', col_expr, re.IGNORECASE):
+        if self.WINDOW_FUNCTION_PATTERN.search(col_expr):
             # Extract the alias after the window function
-            alias_match = re.search(r'\)\s+AS\s+([\w_]+)', col_expr, re.IGNORECASE)
+            alias_match = self.WINDOW_ALIAS_PATTERN.search(col_expr)
             if alias_match:
                 alias_name = alias_match.group(1).strip()
             return {
@@ -333,7 +479,7 @@ class SQLLineageParser:
             }
         
         # Check for table.* pattern first
-        star_match = re.match(r'(\w+)\.\*', col_expr)
+        star_match = self.STAR_PATTERN.match(col_expr)
         if star_match:
             table_name = star_match.group(1)
             column_name = '*'
@@ -348,24 +494,24 @@ class SQLLineageParser:
             }
         
         # Handle AS alias
-        alias_match = re.search(r'(.*?)\s+AS\s+([\w_]+)', col_expr, re.IGNORECASE)
+        alias_match = self.ALIAS_PATTERN.search(col_expr)
         if alias_match:
             base_expr = alias_match.group(1).strip()
             alias_name = alias_match.group(2).strip()
         else:
             base_expr = col_expr
             # For non-aliased columns, extract the last identifier
-            match = re.search(r'[\w_]+$', base_expr)
+            match = self.TRAILING_IDENTIFIER_PATTERN.search(base_expr)
             if match:
                 alias_name = match.group(0)
         
         # Check if this is a function or derived column
-        is_derived = bool(re.search(r'\(.*\)', base_expr))
+        is_derived = bool(self.FUNCTION_CALL_PATTERN.search(base_expr))
         
         # Extract table and column from base expression
         if '.' in base_expr:
             # Handle table.column pattern
-            parts = re.findall(r'[\w_]+', base_expr)
+            parts = self.IDENTIFIER_PATTERN.findall(base_expr)
             if len(parts) >= 2:
                 table_name = parts[-2]
                 column_name = parts[-1]
@@ -373,7 +519,7 @@ class SQLLineageParser:
                 column_name = parts[0]
         else:
             # Simple column reference
-            parts = re.findall(r'[\w_]+', base_expr)
+            parts = self.IDENTIFIER_PATTERN.findall(base_expr)
             if parts:
                 column_name = parts[0]
         
@@ -386,20 +532,25 @@ class SQLLineageParser:
             'is_derived': is_derived
         }
     
-    def extract_join_info(self, stmt) -> List[Dict[str, str]]:
-        """Extract JOIN information with database context"""
+    def extract_join_info(self, sql_text: str) -> List[Dict[str, str]]:
+        """Extract JOIN information with database context (sql_text: stripped statement)"""
         joins = []
-        sql_text = str(stmt).strip()
         
-        # Pattern to match different types of JOINs
-        join_pattern = r'(?:LEFT|RIGHT|INNER|OUTER|CROSS)?\s*JOIN\s+([\w_.]+)(?:\s+(?:AS\s+)?(\w+))?\s+ON\s+(.*?)(?=\s+(?:LEFT|RIGHT|INNER|OUTER|CROSS)?\s*JOIN|\s+WHERE|\s+GROUP\s+BY|\s+ORDER\s+BY|\s*$)'
+        text_end = len(sql_text.rstrip())
+        pos = 0
         
-        join_matches = re.finditer(join_pattern, sql_text, re.IGNORECASE | re.DOTALL)
-        
-        for match in join_matches:
+        # Find each JOIN head, then cut its condition at the next clause keyword
+        while True:
+            match = self.JOIN_PATTERN.search(sql_text, pos)
+            if match is None:
+                break
             full_table_name = match.group(1)
             table_alias = match.group(2)
-            join_condition = match.group(3).strip()
+            
+            condition_start = match.end()
+            end_match = self.JOIN_CONDITION_END_PATTERN.search(sql_text, condition_start)
+            pos = end_match.start() if end_match else max(text_end, condition_start)
+            join_condition = sql_text[condition_start:pos].strip()
             
             # Parse database.schema.table pattern
             parts = full_table_name.split('.')
@@ -427,9 +578,11 @@ class SQLLineageParser:
             
         return joins
     
-    def process_column_lineage(self, col_info: Dict, parent_tables: List, join_info: List, filename: str, level: int) -> Dict[str, str]:
+    def process_column_lineage(self, col_info: Dict, parent_tables: List, join_info: List, filename: str, level: int, table_lookup: Optional[tuple] = None) -> Optional[Dict[str, str]]:
         """Process a single column to determine its lineage"""
         remarks = ""
+        if table_lookup is None:
+            table_lookup = self.build_table_lookup(parent_tables, join_info)
         
         # Handle derived columns (window functions, etc.)
         if col_info.get('is_derived'):
@@ -448,13 +601,12 @@ class SQLLineageParser:
         
         # Skip single character table names unless they're valid aliases
         if col_info.get('table_name') and len(col_info['table_name']) == 1:
-            valid_alias = any(t['alias'] == col_info['table_name'] for t in parent_tables) or \
-                         any(j['table_alias'] == col_info['table_name'] for j in join_info)
+            valid_alias = col_info['table_name'] in table_lookup[0]
             if not valid_alias:
                 return None
         
         # Determine database and table names
-        database_name, table_name = self.resolve_table_reference(col_info, parent_tables, join_info)
+        database_name, table_name = self.resolve_table_reference(col_info, parent_tables, join_info, table_lookup)
         
         # Handle column names
         column_name = col_info.get('column_name', '')
@@ -470,14 +622,15 @@ class SQLLineageParser:
                 'remarks': 'all_columns_selected'
             }
         
-        # Determine remarks for derived columns
-        original_expr = col_info.get('original_expression', '').upper()
+        # Determine remarks for derived columns (one pattern per category, in priority order)
         if not remarks:
-            if 'ROW_NUMBER()' in original_expr or 'RANK()' in original_expr or 'DENSE_RANK()' in original_expr:
+            # Upper-cased only here: star rows and rejected aliases never need it
+            original_expr = col_info.get('original_expression', '').upper()
+            if self.RANKING_FUNCTION_PATTERN.search(original_expr):
                 remarks = "derived_column_window_function"
-            elif any(func in original_expr for func in ['COALESCE(', 'CASE WHEN', 'NVL(', 'CONCAT(', 'CAST(']):
+            elif self.DERIVED_FUNCTION_PATTERN.search(original_expr):
                 remarks = "derived_column"
-            elif any(keyword in original_expr for keyword in ["'ACCOUNTMNEMONIC'", "'PRIMO'", "'L'", "'BR'", "'FALSE'", "'TRUE'"]):
+            elif self.CONSTANT_VALUE_PATTERN.search(original_expr):
                 remarks = "constant_value"
             elif database_name == 'N/A':
                 remarks = "database_not_specified_in_query"
@@ -495,7 +648,29 @@ class SQLLineageParser:
             'remarks': remarks
         }
     
-    def resolve_table_reference(self, col_info: Dict, parent_tables: List, join_info: List) -> tuple:
+    def build_table_lookup(self, parent_tables: List, join_info: List) -> tuple:
+        """
+        Build (alias -> (database, table), table name -> (database, table)) for one statement.
+        Main tables are entered before joins and the first entry for a key wins, so lookups
+        resolve exactly as a scan of main tables, then joins, would.
+        """
+        alias_map = {}
+        name_map = {}
+        for table in parent_tables:
+            target = (table['database_name'], table['table_name'])
+            if table['alias'] not in alias_map:
+                alias_map[table['alias']] = target
+            if table['table_name'] not in name_map:
+                name_map[table['table_name']] = target
+        for join in join_info:
+            target = (join['database_name'], join['table_name'])
+            if join.get('table_alias') not in alias_map:
+                alias_map[join.get('table_alias')] = target
+            if join['table_name'] not in name_map:
+                name_map[join['table_name']] = target
+        return alias_map, name_map
+    
+    def resolve_table_reference(self, col_info: Dict, parent_tables: List, join_info: List, table_lookup: Optional[tuple] = None) -> tuple:
         """Resolve table references to get actual database and table names"""
         col_table_name = col_info.get('table_name')
         
@@ -505,25 +680,14 @@ class SQLLineageParser:
                 return parent_tables[0]['database_name'], parent_tables[0]['table_name']
             return 'unknown', 'unknown'
         
-        # Check if this matches any main table alias
-        for table in parent_tables:
-            if table['alias'] == col_table_name:
-                return table['database_name'], table['table_name']
-        
-        # Check if this matches any join table alias
-        for join in join_info:
-            if join.get('table_alias') == col_table_name:
-                return join['database_name'], join['table_name']
-        
-        # Check if this is an actual table name (not an alias)
-        for table in parent_tables:
-            if table['table_name'] == col_table_name:
-                return table['database_name'], table['table_name']
+        if table_lookup is None:
+            table_lookup = self.build_table_lookup(parent_tables, join_info)
+        alias_map, name_map = table_lookup
         
-        # Check joins for actual table name
-        for join in join_info:
-            if join['table_name'] == col_table_name:
-                return join['database_name'], join['table_name']
+        # Aliases (main tables, then joins) take precedence over actual table names
+        resolved = alias_map.get(col_table_name) or name_map.get(col_table_name)
+        if resolved:
+            return resolved
         
         # If we have a table name but can't resolve it, try to extract from context
         if '.' in col_table_name:
@@ -535,38 +699,89 @@ class SQLLineageParser:
         
         return 'unknown', col_table_name
     
-    def create_lineage_dataframe(self, lineage_data: List[Dict[str, str]]) -> pd.DataFrame:
+    def create_lineage_dataframe(self, lineage_data: List[Dict[str, str]]) -> 'pd.DataFrame':
         """Create final DataFrame in the desired format"""
-        if not lineage_data:
-            return pd.DataFrame(columns=['Database Name', 'Table Name', 'Column Name', 'Alias Name', 'Remarks'])
+        keys = self.LINEAGE_KEYS
+        return self.entries_to_dataframe([tuple(row[key] for key in keys) for row in lineage_data])
+    
+    def entries_to_dataframe(self, entries: List[tuple]) -> 'pd.DataFrame':
+        """create_lineage_dataframe for rows that are already LineageEntry (or plain) tuples"""
+        # Remove duplicates (first occurrence kept, in order) before pandas sees the rows
+        return self._unique_entries_to_dataframe(list(dict.fromkeys(entries)))
+    
+    def _unique_entries_to_dataframe(self, entries: List[tuple]) -> 'pd.DataFrame':
+        """Build the sorted output frame from already de-duplicated rows"""
+        import pandas as pd
+        
+        if not entries:
+            return pd.DataFrame(columns=self.OUTPUT_COLUMNS)
             
-        df = pd.DataFrame(lineage_data)
-        df = df.rename(columns={
-            'database_name': 'Database Name',
-            'table_name': 'Table Name', 
-            'column_name': 'Column Name',
-            'alias_name': 'Alias Name',
-            'remarks': 'Remarks'
-        })
-        
-        # Remove duplicates and sort
-        df = df.drop_duplicates().reset_index(drop=True)
+        df = pd.DataFrame.from_records(entries, columns=self.OUTPUT_COLUMNS)
+        
+        # Sort
         df = df.sort_values(['Database Name', 'Table Name', 'Column Name'])
         
         return df
+    
+    @staticmethod
+    def sort_entries(entries: List[tuple]) -> List[tuple]:
+        """Rows in DataFrame output order: by database, table, column (stable, like sort_values)"""
+        return sorted(entries, key=itemgetter(0, 1, 2))
+    
+    def write_entries_csv(self, entries: List[tuple], output_file: str) -> None:
+        """Write sorted, de-duplicated rows as the CSV DataFrame.to_csv(index=False) would produce"""
+        with open(output_file, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file, lineterminator='\n')
+            writer.writerow(self.OUTPUT_COLUMNS)
+            writer.writerows(entries)
+
 
+# Files at least this large are decoded straight from a read-only mapping
+MMAP_MIN_BYTES = 64 * 1024
 
-def main():
+
+def _read_sql_text(sql_file: str) -> Union[str, Exception]:
+    """UTF-8 text of one SQL file, or the exception raised opening, reading or decoding it"""
+    try:
+        with open(sql_file, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < MMAP_MIN_BYTES:
+                return file.read().decode('utf-8')
+            # Decoding from the page cache skips the intermediate bytes copy of read()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, 'utf-8')
+    except Exception as e:
+        return e
+
+
+# Parser owned by each parse_sql_files worker process, so its parse cache spans that worker's files
+_worker_parser: Optional[SQLLineageParser] = None
+
+
+def _init_file_worker(parser_cls: type) -> None:
+    """Process-pool initializer: build one parser per worker"""
+    global _worker_parser
+    _worker_parser = parser_cls()
+
+
+def _read_and_parse_in_worker(sql_file: str) -> tuple:
+    """Process-pool task: read and parse one file with the worker's parser"""
+    return _worker_parser.read_and_parse_file(sql_file)
+
+
+def main() -> None:
     """Main entry point for command-line usage"""
     print("=" * 80)
     print("SQL LINEAGE PARSER v2.0")
     print("=" * 80)
     print()
     
-    # Check if files are provided as command-line arguments
-    if len(sys.argv) > 1:
-        sql_files = sys.argv[1:]
-    else:
+    # Rendering the whole table builds it a second time as one string, so it is opt-in
+    args = sys.argv[1:]
+    print_table = '--print' in args
+    sql_files = [arg for arg in args if arg != '--print']
+    
+    # No files provided as command-line arguments
+    if not sql_files:
         # Interactive mode - ask for files
         print("No SQL files provided as arguments.")
         print()
@@ -576,46 +791,39 @@ def main():
             sys.exit(1)
         sql_files = file_input.split()
     
-    # Validate files exist
-    valid_files = []
-    for f in sql_files:
-        if os.path.exists(f):
-            valid_files.append(f)
-        else:
-            print(f"⚠️  Warning: File '{f}' not found, skipping...")
-    
-    if not valid_files:
-        print("❌ No valid SQL files found. Exiting.")
-        sys.exit(1)
-    
-    print(f"\n📁 Processing {len(valid_files)} file(s)...")
+    print(f"\n📁 Processing {len(sql_files)} file(s)...")
     print()
     
-    # Parse SQL files
+    # Parse SQL files (missing ones are reported and skipped by the parser)
     parser = SQLLineageParser()
-    result_df = parser.parse_sql_files(valid_files)
+    entries = parser.sort_entries(parser.collect_lineage_entries(sql_files))
+    
+    if len(parser.missing_files) == len(sql_files):
+        print("❌ No valid SQL files found. Exiting.")
+        sys.exit(1)
     
     # Display results
-    print()
-    print("=" * 80)
-    print("LINEAGE ANALYSIS RESULTS")
-    print("=" * 80)
-    print()
-    print(result_df.to_string(index=False))
+    if print_table:
+        print()
+        print("=" * 80)
+        print("LINEAGE ANALYSIS RESULTS")
+        print("=" * 80)
+        print()
+        print(parser._unique_entries_to_dataframe(entries).to_string(index=False))
     
     # Save to CSV
     output_file = 'sql_lineage_output.csv'
-    result_df.to_csv(output_file, index=False)
+    parser.write_entries_csv(entries, output_file)
     
     # Summary
     print()
     print("=" * 80)
     print("SUMMARY")
     print("=" * 80)
-    print(f"✅ Total columns found: {len(result_df)}")
-    print(f"✅ Unique databases: {result_df['Database Name'].nunique()}")
-    print(f"✅ Unique tables: {result_df['Table Name'].nunique()}")
-    print(f"✅ Unique columns: {result_df['Column Name'].nunique()}")
+    print(f"✅ Total columns found: {len(entries)}")
+    print(f"✅ Unique databases: {len({entry[0] for entry in entries})}")
+    print(f"✅ Unique tables: {len({entry[1] for entry in entries})}")
+    print(f"✅ Unique columns: {len({entry[2] for entry in entries})}")
     print()
     print(f"💾 Results saved to: {output_file}")
     print()
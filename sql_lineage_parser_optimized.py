@@ -19,6 +19,135 @@ pd.set_option('display.max_columns', None)
 pd.set_option('display.width', None)
 pd.set_option('display.max_colwidth', None)
 
+# Substitutions for clean_and_fix_sql / convert_impala_to_spark_sql, compiled once at import
+# as (pattern, replacement) pairs and applied in order
+
+# #NAME# parameters are replaced in one pass; names not listed get DEFAULT_PARAMETER_VALUE
+PARAMETER_PATTERN = re.compile(r'#([A-Z_]+)#')
+PARAMETER_VALUES = {
+    'START_DATE': '20231101',
+    'END_DATE': '20231130',
+    'BATCH_DATE': '20231101',
+}
+DEFAULT_PARAMETER_VALUE = '20231101'
+
+CLEANUP_PATTERNS = [
+    (re.compile(r'PERCENTILE_CONT\s*\(\s*([0-9.]+)\s*\)\s+WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+([^)]+)\s*\)\s*OVER\s*\(\s*\)', re.IGNORECASE),
+     r'PERCENTILE(\1, \2)'),
+    (re.compile(r'PERCENTILE_DISC\s*\(\s*([0-9.]+)\s*\)\s+WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+([^)]+)\s*\)\s*OVER\s*\(\s*\)', re.IGNORECASE),
+     r'PERCENTILE(\1, \2)'),
+    (re.compile(r'(\w+)\s*\(\s*([^)]*)\s*\)\s+WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+([^)]+)\s*\)', re.IGNORECASE),
+     r'\1(\2, \3)'),
+    (re.compile(r'(\bFROM\s+\w+(?:\.\w+)*)\s+by\s+\w+\s+(\bWHERE\b)', re.IGNORECASE), r'\1 \2'),
+    (re.compile(r'\bWHERE\s+([a-zA-Z_]\w*\.\w+)\s*=', re.IGNORECASE), r'WHERE \1 ='),
+    (re.compile(r'\bDATEADD\s*\(\s*(\w+)\s*,\s*([^,]+)\s*,\s*([^)]+)\s*\)', re.IGNORECASE), r'DATE_ADD(\3, \2)'),
+    (re.compile(r'\bDATESUB\s*\(\s*([^,]+)\s*,\s*([^)]+)\s*\)', re.IGNORECASE), r'DATE_SUB(\1, \2)'),
+    (re.compile(r'\bADD_MONTHS\s*\(\s*([^,]+)\s*,\s*([^)]+)\s*\)', re.IGNORECASE), r'DATE_ADD(\1, INTERVAL \2 MONTH)'),
+    (re.compile(r'\bMONTHS_BETWEEN\s*\(\s*([^,]+)\s*,\s*([^)]+)\s*\)', re.IGNORECASE), r'DATEDIFF(\1, \2) / 30'),
+    (re.compile(r'\bINTERVAL\s+(\d+)\s+YEARS?\b', re.IGNORECASE), r'INTERVAL \1 YEAR'),
+    (re.compile(r'\bINTERVAL\s+(\d+)\s+MONTHS?\b', re.IGNORECASE), r'INTERVAL \1 MONTH'),
+    (re.compile(r'\bINTERVAL\s+(\d+)\s+DAYS?\b', re.IGNORECASE), r'INTERVAL \1 DAY'),
+]
+
+# Impala function calls renamed for Spark, matched in one pass: the first group catches the
+# zero-argument time functions (with their "()"), the second the name of any other mapped call
+FUNCTION_MAPPINGS = {
+    'now': 'CURRENT_TIMESTAMP',
+    'getdate': 'CURRENT_TIMESTAMP',
+    'current_time': 'CURRENT_TIMESTAMP',
+    'isnull': 'nvl(',
+    'len': 'length(',
+    'datediff': 'datediff(',
+    'dateadd': 'date_add(',
+    'year': 'year(',
+    'month': 'month(',
+    'day': 'day(',
+    'ndv': 'approx_count_distinct(',
+    'appx_median': 'percentile_approx(',
+}
+FUNCTION_CALL_PATTERN = re.compile(
+    r'\b(?:(now|getdate|current_time)\s*\(\s*\)|(isnull|len|datediff|dateadd|year|month|day|ndv|appx_median)\s*\()',
+    re.IGNORECASE
+)
+
+CONVERSION_PATTERNS = [
+    (re.compile(r'\bpercentile_approx\s*\(\s*([^)]+)\s*\)', re.IGNORECASE), r'percentile_approx(\1, 0.5)'),
+    (re.compile(r'\bGROUP_CONCAT\s*\(\s*([^,]+)\s*,\s*([^)]+)\s*\)', re.IGNORECASE), r'concat_ws(\2, collect_list(\1))'),
+    (re.compile(r'\bGROUP_CONCAT\s*\(\s*DISTINCT\s+([^)\s]+)\s+ORDER\s+BY\s+[^,]+\s*,\s*([^)]+)\s*\)', re.IGNORECASE),
+     r'concat_ws(\2, collect_list(DISTINCT \1))'),
+    (re.compile(r'\bGROUP_CONCAT\s*\(\s*([^)]+)\s*\)', re.IGNORECASE), r'concat_ws(\',\', collect_list(\1))'),
+    (re.compile(r"\bDATE\s+'([^']+)'", re.IGNORECASE), r"date('\1')"),
+    (re.compile(r"\bTIMESTAMP\s+'([^']+)'", re.IGNORECASE), r"timestamp('\1')"),
+    (re.compile(r'\bOFFSET\s+(\d+)\s+ROWS?\b', re.IGNORECASE), r'OFFSET \1'),
+    (re.compile(r'\bTRUE\b', re.IGNORECASE), 'true'),
+    (re.compile(r'\bFALSE\b', re.IGNORECASE), 'false'),
+    (re.compile(r'/\*\s*\+\s*[^*]*\*/', re.IGNORECASE), ''),
+]
+
+# split_sql_statements: comments, then quoted strings (a quote preceded by a backslash neither
+# opens nor closes one; an unterminated string runs to the end) or a ';' delimiter
+SQL_COMMENT_PATTERN = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+STATEMENT_TOKEN_PATTERN = re.compile(
+    r"(?<!\\)'(?:[^']|(?<=\\)')*(?:(?<!\\)'|\Z)"
+    r'|(?<!\\)"(?:[^"]|(?<=\\)")*(?:(?<!\\)"|\Z)'
+    r'|;'
+)
+
+# simplify_query_to_select_and_joins: the same quoted strings, or a parenthesis
+PAREN_TOKEN_PATTERN = re.compile(
+    r"(?<!\\)'(?:[^']|(?<=\\)')*(?:(?<!\\)'|\Z)"
+    r'|(?<!\\)"(?:[^"]|(?<=\\)")*(?:(?<!\\)"|\Z)'
+    r'|[()]'
+)
+SELECT_WORD_PATTERN = re.compile(r'\bselect\b', re.IGNORECASE)
+# A main SELECT after the CTE list, tried at a position (leading whitespace allowed)
+MAIN_SELECT_PATTERN = re.compile(r'\s*select\b', re.IGNORECASE)
+# A leading WITH that opens a CTE list
+CTE_START_PATTERN = re.compile(r'\s*with\s+', re.IGNORECASE)
+
+# simplify_single_query: clause keywords for the main-query token filter
+KEEP_KEYWORDS = frozenset({'select', 'from', 'join', 'inner', 'left', 'right', 'full', 'outer',
+                           'cross', 'on', 'using', 'as', 'distinct'})
+SET_OPERATORS = frozenset({'union', 'intersect', 'except', 'all'})  # Set operators that break clauses
+SKIP_KEYWORDS = frozenset({'where', 'group', 'having', 'order', 'limit', 'offset', 'fetch', 'qualify', 'window'})
+
+# extract_static_value_edges: a '(' opening a SELECT subquery, and the alias after its ')'
+SUBQUERY_START_PATTERN = re.compile(r'\(+\s*select\b', re.IGNORECASE)
+SUBQUERY_ALIAS_PATTERN = re.compile(r'\s*(?:as\s+)?(\w+)', re.IGNORECASE)
+
+# detect_sql_dialect: lowercase substrings that point at each dialect
+IMPALA_INDICATORS = (
+    'compute stats', 'invalidate metadata', 'refresh functions',
+    'show table stats', 'show column stats', 'upsert into',
+    'parquet_file(', 'appx_median(', 'impala_version()',
+    'ndv(', 'group_concat(', 'isnull(', 'len(', 'now()', 'getdate()'
+)
+SPARK_INDICATORS = (
+    'cache table', 'uncache table', 'refresh table',
+    'analyze table compute statistics', 'create or replace temporary view',
+    'spark_version()', 'collect_list(', 'collect_set('
+)
+
+# process_select_clause: the literal SELECT-item forms with a static value, as one alternation
+# in priority order; each form is an outer named group, so match.lastgroup names the form
+STATIC_LITERAL_PATTERN = re.compile(
+    r"(?P<string>'(?P<string_value>[^']*)'(?:\s+as\s+(?P<string_alias>\w+))?)$"
+    r"|(?P<null>null\s+as\s+(?P<null_alias>\w+))$"
+    r"|(?P<bool>(?P<bool_value>true|false)\s+as\s+(?P<bool_alias>\w+))$"
+    r"|(?P<date>date\s+'(?P<date_value>[^']+)'(?:\s+as\s+(?P<date_alias>\w+))?)$"
+    r"|(?P<timestamp>timestamp\s+'(?P<timestamp_value>[^']+)'(?:\s+as\s+(?P<timestamp_alias>\w+))?)$"
+    r"|(?P<interval>interval\s+'(?P<interval_value>[^']+)'\s+(?P<interval_unit>\w+)(?:\s+as\s+(?P<interval_alias>\w+))?)$"
+    r"|(?P<number>(?P<number_value>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\s+as\s+(?P<number_alias>\w+))$"
+    r"|(?P<hex>(?P<hex_value>0x[0-9a-fA-F]+)\s+as\s+(?P<hex_alias>\w+))$"
+    r"|(?P<array>array\s*\[(?P<array_value>[^\]]+)\](?:\s+as\s+(?P<array_alias>\w+))?)$"
+    r"|(?P<map>map\s*\((?P<map_value>[^)]+)\)(?:\s+as\s+(?P<map_alias>\w+))?)$",
+    re.IGNORECASE
+)
+CASE_WORD_PATTERN = re.compile(r'\bcase\b', re.IGNORECASE)
+THEN_STRING_PATTERN = re.compile(r'\bthen\s+\'([^\']+)\'', re.IGNORECASE)
+THEN_NUMBER_PATTERN = re.compile(r'\bthen\s+(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\b', re.IGNORECASE)
+TRAILING_ALIAS_PATTERN = re.compile(r'\bas\s+(\w+)$', re.IGNORECASE)
+
 
 def simplify_query_to_select_and_joins(query: str) -> str:
     """
@@ -38,38 +167,25 @@ def simplify_query_to_select_and_joins(query: str) -> str:
         Returns (processed_content, end_position)
         """
         depth = 1
-        i = start_pos
-        inner_content = ""
-        in_single_quote = False
-        in_double_quote = False
+        end_pos = len(original)
+        i = end_pos
         
-        while i < len(original) and depth > 0:
-            char = original[i]
-            
-            # Handle quotes
-            if char == "'" and not in_double_quote and (i == 0 or original[i-1] != '\\'):
-                in_single_quote = not in_single_quote
-                inner_content += char
-            elif char == '"' and not in_single_quote and (i == 0 or original[i-1] != '\\'):
-                in_double_quote = not in_double_quote
-                inner_content += char
-            elif not in_single_quote and not in_double_quote:
-                if char == '(':
-                    depth += 1
-                    inner_content += char
-                elif char == ')':
-                    depth -= 1
-                    if depth > 0:
-                        inner_content += char
-                else:
-                    inner_content += char
-            else:
-                inner_content += char
-            
-            i += 1
+        # Jump between parentheses; quoted strings match whole, so their parentheses are skipped
+        for match in PAREN_TOKEN_PATTERN.finditer(original, start_pos):
+            token = match.group()
+            if token == '(':
+                depth += 1
+            elif token == ')':
+                depth -= 1
+                if depth == 0:
+                    end_pos = match.start()
+                    i = match.end()
+                    break
+        
+        inner_content = original[start_pos:end_pos]
         
         # Check if this is a subquery (contains SELECT)
-        if re.search(r'\bselect\b', inner_content, re.IGNORECASE):
+        if SELECT_WORD_PATTERN.search(inner_content):
             processed = simplify_single_query(inner_content)
             return f"({processed})", i
         else:
@@ -88,98 +204,95 @@ def simplify_query_to_select_and_joins(query: str) -> str:
         in_double_quote = False
         
         # Check for CTE (WITH clause)
-        cte_match = re.match(r'\s*with\s+', sql, re.IGNORECASE)
+        cte_match = CTE_START_PATTERN.match(sql)
         if cte_match:
             # Process CTE definitions
             i = cte_match.end()
             cte_part = "WITH "
+            # Text is copied into cte_part by slice at each processed parenthesis, not per char
+            segment_start = i
             
             while i < len(sql):
                 char = sql[i]
                 
                 if char == "'" and not in_double_quote:
                     in_single_quote = not in_single_quote
-                    cte_part += char
                     i += 1
                 elif char == '"' and not in_single_quote:
                     in_double_quote = not in_double_quote
-                    cte_part += char
                     i += 1
                 elif char == '(' and not in_single_quote and not in_double_quote:
                     # Start of CTE definition
                     processed_content, new_pos = process_parentheses_content("", i + 1, sql)
-                    cte_part += processed_content
+                    cte_part += sql[segment_start:i] + processed_content
                     i = new_pos
+                    segment_start = new_pos
                 elif not in_single_quote and not in_double_quote:
                     # Check if we've reached the main SELECT
-                    remaining = sql[i:].lstrip()
-                    if re.match(r'select\b', remaining, re.IGNORECASE) and not re.match(r',', sql[i:].lstrip()):
+                    if MAIN_SELECT_PATTERN.match(sql, i):
                         # Found main SELECT, break
-                        result_parts.append(cte_part.rstrip())
+                        result_parts.append((cte_part + sql[segment_start:i]).rstrip())
                         sql = sql[i:]
                         break
                     else:
-                        cte_part += char
                         i += 1
                 else:
-                    cte_part += char
                     i += 1
         
         # Now process the main query
-        # Build tokens while respecting parentheses and quotes
-        tokens = []
-        current_token = ""
-        i = 0
-        in_single_quote = False
-        in_double_quote = False
-        
-        while i < len(sql):
-            char = sql[i]
+        def iter_main_tokens(text: str):
+            """Yield tokens of the main query while respecting parentheses and quotes."""
+            # A token is text[token_start:i], plus any processed parentheses gathered in current_token
+            current_token = ""
+            token_start = 0
+            i = 0
+            in_single_quote = False
+            in_double_quote = False
             
-            if char == "'" and not in_double_quote:
-                in_single_quote = not in_single_quote
-                current_token += char
-            elif char == '"' and not in_single_quote:
-                in_double_quote = not in_double_quote
-                current_token += char
-            elif char == '(' and not in_single_quote and not in_double_quote:
-                # Process subquery or function
-                processed_content, new_pos = process_parentheses_content("", i + 1, sql)
-                current_token += processed_content
-                i = new_pos - 1
-            elif (char.isspace() or char in '(),') and not in_single_quote and not in_double_quote:
-                if current_token:
-                    tokens.append(current_token)
-                    current_token = ""
-                if char in '(),':
-                    tokens.append(char)
-            else:
-                current_token += char
+            while i < len(text):
+                char = text[i]
+                
+                if char == "'" and not in_double_quote:
+                    in_single_quote = not in_single_quote
+                elif char == '"' and not in_single_quote:
+                    in_double_quote = not in_double_quote
+                elif char == '(' and not in_single_quote and not in_double_quote:
+                    # Process subquery or function
+                    processed_content, new_pos = process_parentheses_content("", i + 1, text)
+                    current_token += text[token_start:i] + processed_content
+                    token_start = new_pos
+                    i = new_pos - 1
+                elif (char.isspace() or char in '(),') and not in_single_quote and not in_double_quote:
+                    current_token += text[token_start:i]
+                    if current_token:
+                        yield current_token
+                        current_token = ""
+                    token_start = i + 1
+                    if char in '(),':
+                        yield char
+                
+                i += 1
             
-            i += 1
+            current_token += text[token_start:]
+            if current_token:
+                yield current_token
         
-        if current_token:
-            tokens.append(current_token)
-        
-        # Filter tokens to keep only relevant clauses
-        keep_keywords = ['select', 'from', 'join', 'inner', 'left', 'right', 'full', 'outer', 
-                        'cross', 'on', 'using', 'as', 'distinct']
-        set_operators = ['union', 'intersect', 'except', 'all']  # Set operators that break clauses
-        skip_keywords = ['where', 'group', 'having', 'order', 'limit', 'offset', 'fetch', 'qualify', 'window']
-        
-        filtered_tokens = []
+        # Tokenize, filter to the relevant clauses and reconstruct in one pass; kept tokens go straight into out
+        out = []
+        prev_token = None
         skip_mode = False
         skip_depth = 0
         paren_depth = 0
         
-        for idx, token in enumerate(tokens):
+        for token in iter_main_tokens(sql):
             token_lower = token.lower()
+            keep = False
             
             # Track parentheses depth
             if token == '(':
                 paren_depth += 1
                 if not skip_mode:
-                    filtered_tokens.append(token)
+                    keep = True
                 else:
                     skip_depth += 1
             elif token == ')':
@@ -187,42 +300,35 @@ def simplify_query_to_select_and_joins(query: str) -> str:
                 if skip_mode and skip_depth > 0:
                     skip_depth -= 1
                 elif not skip_mode:
-                    filtered_tokens.append(token)
+                    keep = True
                 
                 # Exit skip mode if we're back at the same level
                 if skip_mode and skip_depth == 0 and paren_depth == 0:
                     skip_mode = False
-            elif token_lower in set_operators and paren_depth == 0:
+            elif token_lower in SET_OPERATORS and paren_depth == 0:
                 # Set operators (UNION, INTERSECT, EXCEPT) end skip mode
                 skip_mode = False
-                filtered_tokens.append(token)
-            elif token_lower in skip_keywords and paren_depth == 0:
-                # Start skipping
+                keep = True
+            elif token_lower in SKIP_KEYWORDS and paren_depth == 0:
+                # Start skipping; a following 'by' of "group by"/"order by" is dropped below
                 skip_mode = True
                 skip_depth = 0
-                
-                # Special handling for "group by", "order by"
-                if token_lower in ['group', 'order'] and idx + 1 < len(tokens):
-                    next_token = tokens[idx + 1].lower()
-                    if next_token == 'by':
-                        continue
             elif token_lower == 'by' and skip_mode:
                 # Skip 'by' in 'group by' or 'order by'
-                continue
+                pass
             elif not skip_mode:
-                filtered_tokens.append(token)
+                keep = True
+            
+            if not keep:
+                continue
+            
+            # Reconstruct the query
+            if prev_token is not None and token not in '(),' and prev_token not in '(,':
+                out.append(" ")
+            out.append(token)
+            prev_token = token
         
-        # Reconstruct the query
-        result = ""
-        for i, token in enumerate(filtered_tokens):
-            if i == 0:
-                result = token
-            elif token in '(),':
-                result += token
-            elif filtered_tokens[i-1] in '(,':
-                result += token
-            else:
-                result += " " + token
+        result = "".join(out)
         
         if result_parts:
             return "\n".join(result_parts) + "\n" + result
@@ -241,99 +347,13 @@ def clean_and_fix_sql(query: str) -> str:
     """Clean and fix common SQL syntax issues before processing."""
     cleaned_query = query
     
-    parameter_replacements = {
-        r'#START_DATE#': '20231101',
-        r'#END_DATE#': '20231130',
-        r'#BATCH_DATE#': '20231101',
-        r'#[A-Z_]+#': '20231101'
-    }
-    
-    for pattern, replacement in parameter_replacements.items():
-        cleaned_query = re.sub(pattern, replacement, cleaned_query)
-    
-    cleaned_query = re.sub(
-        r'PERCENTILE_CONT\s*\(\s*([0-9.]+)\s*\)\s+WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+([^)]+)\s*\)\s*OVER\s*\(\s*\)',
-        r'PERCENTILE(\1, \2)',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'PERCENTILE_DISC\s*\(\s*([0-9.]+)\s*\)\s+WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+([^)]+)\s*\)\s*OVER\s*\(\s*\)',
-        r'PERCENTILE(\1, \2)',
-        cleaned_query,
-        flags=re.IGNORECASE
+    cleaned_query = PARAMETER_PATTERN.sub(
+        lambda match: PARAMETER_VALUES.get(match.group(1), DEFAULT_PARAMETER_VALUE),
+        cleaned_query
     )
     
-    cleaned_query = re.sub(
-        r'(\w+)\s*\(\s*([^)]*)\s*\)\s+WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+([^)]+)\s*\)',
-        r'\1(\2, \3)',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'(\bFROM\s+\w+(?:\.\w+)*)\s+by\s+\w+\s+(\bWHERE\b)',
-        r'\1 \2',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'\bWHERE\s+([a-zA-Z_]\w*\.\w+)\s*=',
-        r'WHERE \1 =',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'\bDATEADD\s*\(\s*(\w+)\s*,\s*([^,]+)\s*,\s*([^)]+)\s*\)',
-        r'DATE_ADD(\3, \2)',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'\bDATESUB\s*\(\s*([^,]+)\s*,\s*([^)]+)\s*\)',
-        r'DATE_SUB(\1, \2)',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'\bADD_MONTHS\s*\(\s*([^,]+)\s*,\s*([^)]+)\s*\)',
-        r'DATE_ADD(\1, INTERVAL \2 MONTH)',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'\bMONTHS_BETWEEN\s*\(\s*([^,]+)\s*,\s*([^)]+)\s*\)',
-        r'DATEDIFF(\1, \2) / 30',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'\bINTERVAL\s+(\d+)\s+YEARS?\b',
-        r'INTERVAL \1 YEAR',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'\bINTERVAL\s+(\d+)\s+MONTHS?\b',
-        r'INTERVAL \1 MONTH',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
-    
-    cleaned_query = re.sub(
-        r'\bINTERVAL\s+(\d+)\s+DAYS?\b',
-        r'INTERVAL \1 DAY',
-        cleaned_query,
-        flags=re.IGNORECASE
-    )
+    for pattern, replacement in CLEANUP_PATTERNS:
+        cleaned_query = pattern.sub(replacement, cleaned_query)
     
     return cleaned_query.strip()
 
@@ -342,82 +362,13 @@ def convert_impala_to_spark_sql(query: str) -> str:
     """Convert Impala SQL syntax to Spark SQL syntax."""
     converted_query = clean_and_fix_sql(query)
     
-    function_mappings = {
-        r'\bnow\s*\(\s*\)': 'CURRENT_TIMESTAMP',
-        r'\bgetdate\s*\(\s*\)': 'CURRENT_TIMESTAMP',
-        r'\bcurrent_time\s*\(\s*\)': 'CURRENT_TIMESTAMP',
-        r'\bisnull\s*\(': 'nvl(',
-        r'\blen\s*\(': 'length(',
-        r'\bdatediff\s*\(': 'datediff(',
-        r'\bdateadd\s*\(': 'date_add(',
-        r'\byear\s*\(': 'year(',
-        r'\bmonth\s*\(': 'month(',
-        r'\bday\s*\(': 'day(',
-        r'\bndv\s*\(': 'approx_count_distinct(',
-        r'\bappx_median\s*\(': 'percentile_approx(',
-    }
-    
-    for pattern, replacement in function_mappings.items():
-        converted_query = re.sub(pattern, replacement, converted_query, flags=re.IGNORECASE)
-    
-    converted_query = re.sub(
-        r'\bpercentile_approx\s*\(\s*([^)]+)\s*\)',
-        r'percentile_approx(\1, 0.5)',
-        converted_query,
-        flags=re.IGNORECASE
-    )
-    
-    converted_query = re.sub(
-        r'\bGROUP_CONCAT\s*\(\s*([^,]+)\s*,\s*([^)]+)\s*\)',
-        r'concat_ws(\2, collect_list(\1))',
-        converted_query,
-        flags=re.IGNORECASE
-    )
-    
-    converted_query = re.sub(
-        r'\bGROUP_CONCAT\s*\(\s*DISTINCT\s+([^)\s]+)\s+ORDER\s+BY\s+[^,]+\s*,\s*([^)]+)\s*\)',
-        r'concat_ws(\2, collect_list(DISTINCT \1))',
-        converted_query,
-        flags=re.IGNORECASE
-    )
-    
-    converted_query = re.sub(
-        r'\bGROUP_CONCAT\s*\(\s*([^)]+)\s*\)',
-        r'concat_ws(\',\', collect_list(\1))',
-        converted_query,
-        flags=re.IGNORECASE
-    )
-    
-    converted_query = re.sub(
-        r"\bDATE\s+'([^']+)'", 
-        r"date('\1')", 
-        converted_query, 
-        flags=re.IGNORECASE
-    )
-    
-    converted_query = re.sub(
-        r"\bTIMESTAMP\s+'([^']+)'", 
-        r"timestamp('\1')", 
-        converted_query, 
-        flags=re.IGNORECASE
-    )
-    
-    converted_query = re.sub(
-        r'\bOFFSET\s+(\d+)\s+ROWS?\b', 
-        r'OFFSET \1', 
-        converted_query, 
-        flags=re.IGNORECASE
+    converted_query = FUNCTION_CALL_PATTERN.sub(
+        lambda match: FUNCTION_MAPPINGS[(match.group(1) or match.group(2)).lower()],
+        converted_query
     )
     
-    converted_query = re.sub(r'\bTRUE\b', 'true', converted_query, flags=re.IGNORECASE)
-    converted_query = re.sub(r'\bFALSE\b', 'false', converted_query, flags=re.IGNORECASE)
-    
-    converted_query = re.sub(
-        r'/\*\s*\+\s*[^*]*\*/', 
-        '', 
-        converted_query, 
-        flags=re.IGNORECASE
-    )
+    for pattern, replacement in CONVERSION_PATTERNS:
+        converted_query = pattern.sub(replacement, converted_query)
     
     return converted_query.strip()
 
@@ -426,21 +377,9 @@ def detect_sql_dialect(query: str) -> str:
     """Detect SQL dialect based on function patterns."""
     query_lower = query.lower()
     
-    impala_indicators = [
-        'compute stats', 'invalidate metadata', 'refresh functions',
-        'show table stats', 'show column stats', 'upsert into',
-        'parquet_file(', 'appx_median(', 'impala_version()',
-        'ndv(', 'group_concat(', 'isnull(', 'len(', 'now()', 'getdate()'
-    ]
-    
-    spark_indicators = [
-        'cache table', 'uncache table', 'refresh table',
-        'analyze table compute statistics', 'create or replace temporary view',
-        'spark_version()', 'collect_list(', 'collect_set('
-    ]
-    
-    impala_score = sum(1 for indicator in impala_indicators if indicator in query_lower)
-    spark_score = sum(1 for indicator in spark_indicators if indicator in query_lower)
+    # Each indicator present counts once; str's substring search beats one regex alternation here
+    impala_score = sum(1 for indicator in IMPALA_INDICATORS if indicator in query_lower)
+    spark_score = sum(1 for indicator in SPARK_INDICATORS if indicator in query_lower)
     
     if impala_score > spark_score and impala_score > 0:
         return 'impala'
@@ -468,49 +407,24 @@ def parse_arguments():
 
 def split_sql_statements(sql_content: str) -> list:
     """Split SQL content into individual statements, handling comments and quoted strings properly."""
-    # First, remove comments before splitting
-    # Remove single-line comments (-- ...)
-    content_no_single_comments = re.sub(r'--[^\n]*', '', sql_content)
-    
-    # Remove multi-line comments (/* ... */)
-    content_no_comments = re.sub(r'/\*.*?\*/', '', content_no_single_comments, flags=re.DOTALL)
+    # First, remove comments (-- ... and /* ... */) before splitting
+    content_no_comments = SQL_COMMENT_PATTERN.sub('', sql_content)
     
     splitted_statements = []
-    current_statement = ""
-    in_single_quote = False
-    in_double_quote = False
-    i = 0
+    start = 0
     
-    while i < len(content_no_comments):
-        char = content_no_comments[i]
-        
-        # Handle single quotes
-        if char == "'" and not in_double_quote:
-            if i > 0 and content_no_comments[i-1] == '\\':
-                current_statement += char
-            else:
-                in_single_quote = not in_single_quote
-                current_statement += char
-        # Handle double quotes
-        elif char == '"' and not in_single_quote:
-            if i > 0 and content_no_comments[i-1] == '\\':
-                current_statement += char
-            else:
-                in_double_quote = not in_double_quote
-                current_statement += char
-        # Handle semicolon (statement delimiter)
-        elif char == ';' and not in_single_quote and not in_double_quote:
-            if current_statement.strip():
-                splitted_statements.append(current_statement.strip().lower())
-            current_statement = ""
-        else:
-            current_statement += char
-        
-        i += 1
+    # Quoted strings match as whole tokens, so every ';' match is a statement delimiter
+    for match in STATEMENT_TOKEN_PATTERN.finditer(content_no_comments):
+        if match.group() == ';':
+            statement = content_no_comments[start:match.start()].strip()
+            if statement:
+                splitted_statements.append(statement.lower())
+            start = match.end()
     
     # Add last statement if exists
-    if current_statement.strip():
-        splitted_statements.append(current_statement.strip().lower())
+    statement = content_no_comments[start:].strip()
+    if statement:
+        splitted_statements.append(statement.lower())
     
     return splitted_statements
 
@@ -562,35 +476,32 @@ def extract_static_value_edges(query: str, result: LineageRunner) -> List[Dict]:
     def extract_select_items(select_clause: str) -> List[str]:
         """Extract individual SELECT items from a SELECT clause."""
         items = []
-        current_item = ""
+        item_start = 0
         paren_depth = 0
         in_quote = False
         quote_char = None
         
-        for char in select_clause:
+        # Items are sliced out between top-level commas rather than built char by char
+        for i, char in enumerate(select_clause):
             if char in ("'", '"') and not in_quote:
                 in_quote = True
                 quote_char = char
-                current_item += char
             elif in_quote and char == quote_char:
                 in_quote = False
                 quote_char = None
-                current_item += char
             elif char == '(' and not in_quote:
                 paren_depth += 1
-                current_item += char
             elif char == ')' and not in_quote:
                 paren_depth -= 1
-                current_item += char
             elif char == ',' and paren_depth == 0 and not in_quote:
-                if current_item.strip():
-                    items.append(current_item.strip())
-                current_item = ""
-            else:
-                current_item += char
+                current_item = select_clause[item_start:i].strip()
+                if current_item:
+                    items.append(current_item)
+                item_start = i + 1
         
-        if current_item.strip():
-            items.append(current_item.strip())
+        current_item = select_clause[item_start:].strip()
+        if current_item:
+            items.append(current_item)
         
         return items
     
@@ -603,84 +514,69 @@ def extract_static_value_edges(query: str, result: LineageRunner) -> List[Dict]:
             column_name = None
             item_stripped = item.strip()
             
+            # One match classifies the literal forms below; alternatives are tried in this order
+            literal_match = STATIC_LITERAL_PATTERN.match(item_stripped)
+            literal_kind = literal_match.lastgroup if literal_match else None
+            
             # Pattern 1: String literal with AS alias (including empty strings)
-            string_match = re.match(r"^'([^']*)'(?:\s+as\s+(\w+))?$", item_stripped, re.IGNORECASE)
-            if string_match:
-                static_value = string_match.group(1).upper() if string_match.group(1) else 'EMPTY_STRING'
-                column_name = string_match.group(2) if string_match.group(2) else 'unknown_column'
+            if literal_kind == 'string':
+                value = literal_match.group('string_value')
+                static_value = value.upper() if value else 'EMPTY_STRING'
+                column_name = literal_match.group('string_alias') or 'unknown_column'
             
             # Pattern 2: NULL literal with AS alias
-            if not static_value:
-                null_match = re.match(r'^null\s+as\s+(\w+)$', item_stripped, re.IGNORECASE)
-                if null_match:
-                    static_value = 'NULL'
-                    column_name = null_match.group(1)
+            elif literal_kind == 'null':
+                static_value = 'NULL'
+                column_name = literal_match.group('null_alias')
             
             # Pattern 3: Boolean literal with AS alias
-            if not static_value:
-                bool_match = re.match(r'^(true|false)\s+as\s+(\w+)$', item_stripped, re.IGNORECASE)
-                if bool_match:
-                    static_value = bool_match.group(1).upper()
-                    column_name = bool_match.group(2)
+            elif literal_kind == 'bool':
+                static_value = literal_match.group('bool_value').upper()
+                column_name = literal_match.group('bool_alias')
             
             # Pattern 4: DATE literal with AS alias
-            if not static_value:
-                date_match = re.match(r"^date\s+'([^']+)'(?:\s+as\s+(\w+))?$", item_stripped, re.IGNORECASE)
-                if date_match:
-                    static_value = f"DATE_{date_match.group(1)}"
-                    column_name = date_match.group(2) if date_match.group(2) else 'unknown_column'
+            elif literal_kind == 'date':
+                static_value = f"DATE_{literal_match.group('date_value')}"
+                column_name = literal_match.group('date_alias') or 'unknown_column'
             
             # Pattern 5: TIMESTAMP literal with AS alias
-            if not static_value:
-                timestamp_match = re.match(r"^timestamp\s+'([^']+)'(?:\s+as\s+(\w+))?$", item_stripped, re.IGNORECASE)
-                if timestamp_match:
-                    static_value = f"TIMESTAMP_{timestamp_match.group(1).replace(' ', '_').replace(':', '-')}"
-                    column_name = timestamp_match.group(2) if timestamp_match.group(2) else 'unknown_column'
+            elif literal_kind == 'timestamp':
+                static_value = f"TIMESTAMP_{literal_match.group('timestamp_value').replace(' ', '_').replace(':', '-')}"
+                column_name = literal_match.group('timestamp_alias') or 'unknown_column'
             
             # Pattern 6: INTERVAL literal with AS alias
-            if not static_value:
-                interval_match = re.match(r"^interval\s+'([^']+)'\s+(\w+)(?:\s+as\s+(\w+))?$", item_stripped, re.IGNORECASE)
-                if interval_match:
-                    static_value = f"INTERVAL_{interval_match.group(1)}_{interval_match.group(2).upper()}"
-                    column_name = interval_match.group(3) if interval_match.group(3) else 'unknown_column'
+            elif literal_kind == 'interval':
+                static_value = f"INTERVAL_{literal_match.group('interval_value')}_{literal_match.group('interval_unit').upper()}"
+                column_name = literal_match.group('interval_alias') or 'unknown_column'
             
             # Pattern 7: Number literal (including negative, decimal, scientific notation) with AS alias
-            if not static_value:
-                # Matches: -5, 100, 3.14, 1.5e10, -2.3e-5
-                number_match = re.match(r'^(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\s+as\s+(\w+)$', item_stripped, re.IGNORECASE)
-                if number_match:
-                    static_value = number_match.group(1)
-                    column_name = number_match.group(2)
+            elif literal_kind == 'number':
+                static_value = literal_match.group('number_value')
+                column_name = literal_match.group('number_alias')
             
             # Pattern 8: Hex literal with AS alias
-            if not static_value:
-                hex_match = re.match(r'^(0x[0-9a-fA-F]+)\s+as\s+(\w+)$', item_stripped, re.IGNORECASE)
-                if hex_match:
-                    static_value = hex_match.group(1).upper()
-                    column_name = hex_match.group(2)
+            elif literal_kind == 'hex':
+                static_value = literal_match.group('hex_value').upper()
+                column_name = literal_match.group('hex_alias')
             
             # Pattern 9: ARRAY literal with AS alias
-            if not static_value:
-                array_match = re.match(r'^array\s*\[([^\]]+)\](?:\s+as\s+(\w+))?$', item_stripped, re.IGNORECASE)
-                if array_match:
-                    array_content = array_match.group(1).strip()
-                    static_value = f"ARRAY_{array_content.replace(',', '_').replace(' ', '')}"
-                    column_name = array_match.group(2) if array_match.group(2) else 'unknown_column'
+            elif literal_kind == 'array':
+                array_content = literal_match.group('array_value').strip()
+                static_value = f"ARRAY_{array_content.replace(',', '_').replace(' ', '')}"
+                column_name = literal_match.group('array_alias') or 'unknown_column'
             
             # Pattern 10: MAP literal with AS alias
-            if not static_value:
-                map_match = re.match(r'^map\s*\(([^)]+)\)(?:\s+as\s+(\w+))?$', item_stripped, re.IGNORECASE)
-                if map_match:
-                    map_content = map_match.group(1).strip()
-                    static_value = f"MAP_{map_content.replace(',', '_').replace(' ', '').replace(chr(39), '')}"
-                    column_name = map_match.group(2) if map_match.group(2) else 'unknown_column'
+            elif literal_kind == 'map':
+                map_content = literal_match.group('map_value').strip()
+                static_value = f"MAP_{map_content.replace(',', '_').replace(' ', '').replace(chr(39), '')}"
+                column_name = literal_match.group('map_alias') or 'unknown_column'
             
             # Pattern 11: CASE with static values
-            if not static_value and re.search(r'\bcase\b', item_stripped, re.IGNORECASE):
-                then_values = re.findall(r'\bthen\s+\'([^\']+)\'', item_stripped, re.IGNORECASE)
-                then_numbers = re.findall(r'\bthen\s+(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\b', item_stripped, re.IGNORECASE)
+            if not static_value and CASE_WORD_PATTERN.search(item_stripped):
+                then_values = THEN_STRING_PATTERN.findall(item_stripped)
+                then_numbers = THEN_NUMBER_PATTERN.findall(item_stripped)
                 
-                alias_match = re.search(r'\bas\s+(\w+)$', item_stripped, re.IGNORECASE)
+                alias_match = TRAILING_ALIAS_PATTERN.search(item_stripped)
                 if alias_match:
                     column_name = alias_match.group(1)
                     
@@ -736,57 +632,42 @@ def extract_static_value_edges(query: str, result: LineageRunner) -> List[Dict]:
         """
         subqueries = []
         depth = 0
-        current_subquery = ""
         in_subquery = False
         in_quote = False
         subquery_start_pos = -1
         i = 0
         
+        # Only positions are tracked; each subquery is sliced out once its ')' is reached
         while i < len(text):
             char = text[i]
             
             if char == "'" and (i == 0 or text[i-1] != '\\'):
                 in_quote = not in_quote
-                if in_subquery:
-                    current_subquery += char
             elif not in_quote:
                 if char == '(':
                     # Check if this starts a SELECT subquery
-                    remaining = text[i:].lstrip('(').lstrip()
-                    if re.match(r'select\b', remaining, re.IGNORECASE):
+                    if SUBQUERY_START_PATTERN.match(text, i):
                         if depth == 0:
                             in_subquery = True
-                            current_subquery = ""
                             subquery_start_pos = i
-                        else:
-                            current_subquery += char
                         depth += 1
                     elif in_subquery:
-                        current_subquery += char
                         depth += 1
                 elif char == ')' and in_subquery:
                     depth -= 1
                     if depth == 0:
                         in_subquery = False
+                        current_subquery = text[subquery_start_pos + 1:i]
                         if current_subquery.strip():
                             # Extract alias after the closing parenthesis
                             alias = "subquery"
-                            remaining_text = text[i+1:].lstrip()
                             # Look for AS alias or direct alias
-                            alias_match = re.match(r'(?:as\s+)?(\w+)', remaining_text, re.IGNORECASE)
+                            alias_match = SUBQUERY_ALIAS_PATTERN.match(text, i + 1)
                             if alias_match and alias_match.group(1).lower() not in ['where', 'group', 'order', 'limit', 'union', 'intersect', 'except', 'join', 'inner', 'left', 'right', 'cross', 'on']:
                                 alias = alias_match.group(1).lower()  # Normalize to lowercase
                             
                             subqueries.append((current_subquery.strip(), alias))
-                        current_subquery = ""
                         subquery_start_pos = -1
-                    else:
-                        current_subquery += char
-                elif in_subquery:
-                    current_subquery += char
-            else:
-                if in_subquery:
-                    current_subquery += char
             
             i += 1
         
@@ -853,28 +734,22 @@ def extract_static_value_edges(query: str, result: LineageRunner) -> List[Dict]:
                 
                 # Extract individual CTEs
                 cte_definitions = []
-                current_cte = ""
+                cte_start = 0
                 paren_depth = 0
                 in_quote = False
                 
-                for char in cte_section:
+                for i, char in enumerate(cte_section):
                     if char in ("'", '"') and not in_quote:
                         in_quote = True
-                        current_cte += char
                     elif in_quote and (char == "'" or char == '"'):
                         in_quote = False
-                        current_cte += char
                     elif char == '(' and not in_quote:
                         paren_depth += 1
-                        current_cte += char
                     elif char == ')' and not in_quote:
                         paren_depth -= 1
-                        current_cte += char
                         if paren_depth == 0:
-                            cte_definitions.append(current_cte)
-                            current_cte = ""
-                    else:
-                        current_cte += char
+                            cte_definitions.append(cte_section[cte_start:i + 1])
+                            cte_start = i + 1
                 
                 # Process each CTE
                 for cte_def in cte_definitions: